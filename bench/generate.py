@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Generate a synthetic CSV file for benchmarks.
+
+The columns are *key*, a string with --cardinality distinct values,
+*num*, a number which is NA with probability --na, and --columns - 2
+text columns t0, t1, ... of --width characters. A text cell contains
+a comma, a quote or a newline with probability --quote, so that it
+must be quoted. The output depends only on the arguments.
+
+    python bench/generate.py --rows 100000 --quote 0.1 > x.csv
+"""
+
+import argparse
+from csv import writer
+import random
+import sys
+
+SPECIALS = [',', '"', '\n']
+
+def fieldnames_make(columns):
+    return ['key', 'num'] + ['t{}'.format(i) for i in xrange(max(columns - 2, 0))]
+
+def rows_g(rows, columns=8, width=16, quote=0.0, na=0.0, cardinality=100, seed=0):
+    """
+    Generate the rows of a synthetic CSV file, as lists of cells.
+    The header is not included, see :fieldnames_make:.
+    """
+
+    r = random.Random(seed)
+
+    ntext = max(columns - 2, 0)
+
+    def text():
+        s = '{:0{}x}'.format(r.getrandbits(4 * width), width)
+        if quote and r.random() < quote:
+            i = r.randrange(width + 1)
+            s = s[:i] + r.choice(SPECIALS) + s[i:]
+        return s
+
+    for i in xrange(rows):
+        key = 'k{}'.format(r.randrange(cardinality))
+        if na and r.random() < na:
+            num = 'NA'
+        else:
+            num = '{:.3f}'.format(r.uniform(-1000, 1000))
+        yield [key, num] + [text() for j in xrange(ntext)]
+
+def csv_generate(f, rows, columns=8, width=16, quote=0.0, na=0.0, cardinality=100, seed=0):
+    """
+    Write a synthetic CSV file, header included, to :f:.
+    """
+    w = writer(f)
+    w.writerow(fieldnames_make(columns))
+    w.writerows(rows_g(
+                    rows=rows,
+                    columns=columns,
+                    width=width,
+                    quote=quote,
+                    na=na,
+                    cardinality=cardinality,
+                    seed=seed,
+                ))
+
+def default_arg_generate(parser):
+
+    parser.add_argument(
+            '--columns',
+            type=int,
+            default=8,
+            help='The number of columns, at least 2.',
+        )
+    parser.add_argument(
+            '--width',
+            type=int,
+            default=16,
+            help='The number of characters of each text cell.',
+        )
+    parser.add_argument(
+            '--quote',
+            type=float,
+            default=0.05,
+            help='The probability that a text cell must be quoted.',
+        )
+    parser.add_argument(
+            '--na',
+            type=float,
+            default=0.05,
+            help='The probability that a number is NA.',
+        )
+    parser.add_argument(
+            '--cardinality',
+            type=int,
+            default=100,
+            help='The number of distinct keys.',
+        )
+    parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='The random seed.',
+        )
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+
+    parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='The number of rows, less the header.',
+        )
+
+    default_arg_generate(parser)
+
+    args = parser.parse_args()
+
+    csv_generate(
+            sys.stdout,
+            rows=args.rows,
+            columns=args.columns,
+            width=args.width,
+            quote=args.quote,
+            na=args.na,
+            cardinality=args.cardinality,
+            seed=args.seed,
+        )
+
+if __name__ == '__main__':
+    main()
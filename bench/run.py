@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""
+Benchmark the CSVU tools on synthetic CSV files.
+
+For each size, a CSV file is generated (see generate.py) and each
+benchmark is timed three ways: reading the file with reader_make
+(*read*), running the tool's filter on rows which are already read
+(*filter*, by the tool's pipeline stage or its entry in FILTERS), and
+running the tool's script end to end (*cli*). Tools in INPUTS2, e.g.
+diff, read a second input as FILE1, and tools in CLI_ONLY have no
+filter to time. The best of --repeat runs is kept, and the results are
+printed as JSON with rows/sec and MB/sec, MB being the size of the
+inputs.
+
+    python bench/run.py --sizes 1000 100000 --repeat 3 > bench.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from csvu import (
+        cells_g_make,
+        pretty_g,
+        reader_make,
+    )
+from csvu.cache import cache_path_of
+from csvu.offsets import index_build, index_path_of
+from csvu.pipe import stage_make
+
+from generate import csv_generate, default_arg_generate
+
+# Each benchmark is a tool followed by its arguments, in which {half}
+# is half the number of rows.
+BENCHES = [
+        ['cat'],
+        ['column-rename', '--rename', 'key', 'k'],
+        ['cut', '--columns', 'key', 'num'],
+        ['dialect', '--dialect1', 'excel-tab'],
+        ['diff', '--coercions', 'bench_coercions'],
+        ['grep', 'key', '^k1'],
+        ['head', '10'],
+        ['index'],
+        ['levenshtein', '--column', 'key', '--target', 'd', '--sort', 'none', 'k1'],
+        ['pretty'],
+        ['put', '--put', 'key', 'x'],
+        ['rank', '--column', 'key', '--target', 'rank'],
+        ['row-reduce', '--reductions', 'bench_reductions', '--coercions', 'bench_coercions', '--formats', 'bench_formats'],
+        ['slice', '{half}'],
+        ['sniff'],
+        ['sort', '--columns', 'key'],
+        ['sort', '--columns', 'num', '--numeric'],
+        ['tail', '10'],
+        ['tr', 'abc', 'xyz'],
+        ['transpose'],
+        ['update', '--keyname', 't0'],
+    ]
+
+# The tools which read a second input, and which generated file it is:
+# 1 is a file of the same size and the next seed, 0 is the first file
+# again. update matches rows by a unique key, which rows of another
+# seed do not share, so it updates a file with itself.
+INPUTS2 = {
+        'cat'   : 1,
+        'diff'  : 1,
+        'update': 0,
+    }
+
+# The tools which work on the file rather than on rows, or which only
+# rewrite rows in another dialect, so have no filter to time.
+CLI_ONLY = set(['dialect', 'index', 'sniff'])
+
+def setup_slice(path):
+    # csvu-slice seeks with an index, see csvu-index.
+    index_build(path, dialect='excel')
+
+# The setup of a benchmark of a tool, before it is timed.
+SETUPS = {
+        'slice': setup_slice,
+    }
+
+def cli_inputs(tool, paths):
+    """
+    The arguments by which :tool: is given its inputs :paths:.
+    """
+    if tool == 'cat':
+        return ['--files'] + paths
+    if tool == 'sniff':
+        return ['--file0', paths[0]]
+    argv = ['--dialect0', 'excel', '--file0', paths[0]]
+    if len(paths) > 1:
+        argv += ['--dialect1', 'excel', '--file1', paths[1]]
+    return argv
+
+def sidecars_remove(path):
+    """
+    Remove the index and the cache of :path:, which the tools may use.
+    """
+    for p in (index_path_of(path), cache_path_of(path)):
+        if os.path.exists(p):
+            os.remove(p)
+
+def filter_cat(module, args, rows0, rows1, fieldnames0, fieldnames1):
+    return module.filter_d(rows_g=[rows0, rows1], fieldnames=[fieldnames0, fieldnames1])['generator']
+
+def filter_diff(module, args, rows0, rows1, fieldnames0, fieldnames1):
+    d = module.filter_d(
+                    row0_g=rows0,
+                    row1_g=rows1,
+                    fieldnames0=fieldnames0,
+                    fieldnames1=fieldnames1,
+                    keyname=args.keyname,
+                    compact=args.compact,
+                    coercions=importlib.import_module(args.coercions),
+                    nastrings=args.nastrings,
+                )
+    return d['generator']
+
+def filter_pretty(module, args, rows0, rows1, fieldnames0, fieldnames1):
+    # The pretty stage passes rows through, the table is made by the writer.
+    return pretty_g(cells_g_make(rows0, fieldnames0), fieldnames=fieldnames0)
+
+def filter_update(module, args, rows0, rows1, fieldnames0, fieldnames1):
+    d = module.filter_d(
+                    row0_g=rows0,
+                    row1_g=rows1,
+                    fieldnames0=fieldnames0,
+                    fieldnames1=fieldnames1,
+                    keyname=args.keyname,
+                    extra_row_action=args.extra_row_action,
+                    extra_col_action=args.extra_col_action,
+                )
+    return d['generator']
+
+# The filters of the tools which are not timed by their pipeline stage,
+# as functions of (module, args, rows0, rows1, fieldnames0, fieldnames1)
+# which return a generator.
+FILTERS = {
+        'cat'   : ('csvu.cat', filter_cat),
+        'diff'  : ('csvu.diff', filter_diff),
+        'pretty': ('csvu.pretty', filter_pretty),
+        'update': ('csvu.update', filter_update),
+    }
+
+# The modules of the row-reduce benchmark, written to the working directory.
+MODULES = {
+        'bench_coercions': '''
+def num(x):
+    return x.strip()
+''',
+        'bench_reductions': '''
+def num(row):
+    return row['num'].upper()
+''',
+    }
+
+def result_make(bench, kind, rows, size, seconds):
+    return {
+            'bench'       : bench,
+            'kind'        : kind,
+            'rows'        : rows,
+            'bytes'       : size,
+            'seconds'     : seconds,
+            'rows_per_sec': rows / seconds if seconds else None,
+            'mb_per_sec'  : size / 1e6 / seconds if seconds else None,
+        }
+
+def best_of(f, repeat):
+    times = []
+    for i in xrange(repeat):
+        t = f()
+        times.append(t)
+    return min(times)
+
+def time_read(path):
+    t0 = time.time()
+    reader_d = reader_make(path, dialect='excel')
+    for row in reader_d['reader']:
+        pass
+    return time.time() - t0
+
+def rows_read(path):
+    reader_d = reader_make(path, dialect='excel')
+    return reader_d['fieldnames'], list(reader_d['reader'])
+
+def time_filter_make(paths, argv):
+
+    fieldnames0, rows0 = rows_read(paths[0])
+    fieldnames1, rows1 = rows_read(paths[1]) if len(paths) > 1 else ([], [])
+
+    if argv[0] in CLI_ONLY:
+        raise Exception("No filter to time: {}".format(argv[0]))
+
+    if argv[0] in FILTERS:
+        module_name, filter_f = FILTERS[argv[0]]
+        module = importlib.import_module(module_name)
+        args = module.cli_arg_parser().parse_args(cli_inputs(argv[0], paths) + argv[1:])
+        def g_make(rows0, rows1):
+            return filter_f(module, args, rows0, rows1, fieldnames0, fieldnames1)
+    else:
+        stage = stage_make(argv)
+        def g_make(rows0, rows1):
+            return stage(rows0, fieldnames0)['generator']
+
+    def f():
+        # Some filters change their rows, so each run gets copies.
+        copies0 = [row.copy() for row in rows0]
+        copies1 = [row.copy() for row in rows1]
+        t0 = time.time()
+        for x in g_make(iter(copies0), iter(copies1)):
+            pass
+        return time.time() - t0
+
+    return f
+
+def time_cli_make(paths, argv):
+
+    script = os.path.join(ROOT, 'bin', 'csvu-' + argv[0])
+    cmd = [sys.executable, script] + cli_inputs(argv[0], paths) + argv[1:]
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, env.get('PYTHONPATH', '')])
+
+    def f():
+        with open(os.devnull, 'w') as devnull:
+            t0 = time.time()
+            p = subprocess.Popen(cmd, stdout=devnull, stderr=subprocess.PIPE, env=env)
+            err = p.communicate()[1]
+            t1 = time.time()
+        if p.returncode != 0:
+            lines = err.strip().splitlines() or ['exit status {}'.format(p.returncode)]
+            raise Exception(lines[-1])
+        return t1 - t0
+
+    return f
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+
+    parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='The numbers of rows of the generated files.',
+        )
+    parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='The number of runs of each benchmark.',
+        )
+    parser.add_argument(
+            '--tools',
+            type=str,
+            nargs='+',
+            default=None,
+            help='Only run the benchmarks of these tools.',
+        )
+    parser.add_argument(
+            '--kinds',
+            choices=['read', 'filter', 'cli'],
+            nargs='+',
+            default=['read', 'filter', 'cli'],
+            help='Only run these kinds of benchmark.',
+        )
+
+    default_arg_generate(parser)
+
+    args = parser.parse_args()
+
+    params = dict(vars(args))
+
+    benches = [b for b in BENCHES if args.tools is None or b[0] in args.tools]
+
+    results = []
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix='csvu-bench-')
+
+    try:
+
+        for name, code in MODULES.iteritems():
+            with open(os.path.join(tmp, name + '.py'), 'w') as f:
+                f.write(code)
+
+        # row-reduce imports its modules from the working directory.
+        os.chdir(tmp)
+        sys.path.append(tmp)
+
+        # csvu-sniff writes to the dialect cache, which is kept here.
+        os.environ['CSVU_DIALECT_CACHE'] = os.path.join(tmp, 'dialects')
+
+        for rows in args.sizes:
+
+            paths = []
+
+            for i in xrange(2):
+
+                path = os.path.join(tmp, 'bench-{}-{}.csv'.format(rows, i))
+
+                with open(path, 'wb') as f:
+                    csv_generate(
+                            f,
+                            rows=rows,
+                            columns=args.columns,
+                            width=args.width,
+                            quote=args.quote,
+                            na=args.na,
+                            cardinality=args.cardinality,
+                            seed=args.seed + i,
+                        )
+
+                paths.append(path)
+
+            path, path1 = paths
+
+            if 'read' in args.kinds:
+                seconds = best_of(lambda: time_read(path), args.repeat)
+                results.append(result_make('read', 'read', rows, os.path.getsize(path), seconds))
+
+            for argv in benches:
+
+                bench = ' '.join(argv)
+
+                argv = [a.format(half=rows // 2) for a in argv]
+
+                inputs = [path]
+                if argv[0] in INPUTS2:
+                    inputs.append(paths[INPUTS2[argv[0]]])
+
+                size = sum(os.path.getsize(p) for p in inputs)
+
+                for kind, f_make in [('filter', time_filter_make), ('cli', time_cli_make)]:
+                    if not kind in args.kinds:
+                        continue
+                    if kind == 'filter' and argv[0] in CLI_ONLY:
+                        continue
+                    try:
+                        if argv[0] in SETUPS:
+                            SETUPS[argv[0]](path)
+                        seconds = best_of(f_make(inputs, argv), args.repeat)
+                    except (Exception, SystemExit) as exc:
+                        r = result_make(bench, kind, rows, size, None)
+                        r['error'] = repr(exc)
+                        results.append(r)
+                        continue
+                    finally:
+                        # Each benchmark reads the files as generated.
+                        for p in paths:
+                            sidecars_remove(p)
+                    results.append(result_make(bench, kind, rows, size, seconds))
+
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+    print json.dumps({'params': params, 'results': results}, indent=4, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
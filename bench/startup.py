@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Measure the startup time of each CSVU tool.
+
+For each tool, time how long the interpreter takes to start and import
+the tool's module, and print the best of --repeat runs as JSON, along
+with the time to start the interpreter alone.
+
+    python bench/startup.py --repeat 20 > startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from csvu.main import TOOLS, module_of
+
+def best_of(code, repeat):
+    times = []
+    for i in xrange(repeat):
+        t0 = time.time()
+        subprocess.check_call([sys.executable, '-c', code])
+        times.append(time.time() - t0)
+    return min(times)
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+
+    parser.add_argument(
+            '--repeat',
+            type=int,
+            default=10,
+            help='The number of runs per tool.',
+        )
+
+    args = parser.parse_args()
+
+    d = {'python': best_of('pass', args.repeat), 'tools': {}}
+
+    for tool in TOOLS:
+        d['tools'][tool] = best_of('import {}'.format(module_of(tool)), args.repeat)
+
+    print json.dumps(d, indent=4, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
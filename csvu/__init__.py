@@ -1,93 +1,514 @@
 
 from cStringIO import StringIO
-from csv import excel, reader, DictReader, DictWriter, Sniffer
+from csv import excel, reader, writer, Sniffer
+import os
 import sys
-from itertools import izip
-from prettytable import PrettyTable
+from itertools import chain, ifilter, islice, izip
+
+from csvu.cache import (
+        cache_build_g,
+        cache_open,
+        cache_reader_make,
+    )
+from csvu.compress import (
+        COMPRESSION_LEVEL,
+        CompressedFile,
+        compression_of_file,
+        compression_of_path,
+        reader_file_make,
+    )
+from csvu.dialect_cache import dialect_cache_get
+from csvu.prefetch import Prefetch
+from csvu.profiling import (
+        profiled,
+        reader_profiled,
+        writer_profiled,
+    )
+from csvu.row import (
+        Row,
+        Schema,
+        cells_project_g,
+        projection_make,
+        row_g_make,
+    )
+from csvu.records import (
+        dialect_params,
+        mmap_reader_make,
+        parallel_reader_make,
+    )
+from csvu.stats import (
+        reader_counted,
+        stats_current,
+        writer_counted,
+    )
 
 DELIMITERS = ',\t|'
 
-def reader_make(file_or_path='-', dialect='sniff', headless=False):
+SNIFF_SIZE = 64 * 1024
+
+BUFFER_SIZE = 1024 * 1024
+
+PRETTY_SIZE = 1000
+
+@profiled('sniff')
+def dialect_sniff(sample):
+    """
+    Sniff the dialect of a sample of a CSV file, defaulting to excel.
+    """
+    try:
+        return Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except:
+        return excel
+
+def sniff_make(f, size=SNIFF_SIZE):
+    """
+    Sniff the dialect of a CSV file from a bounded sample.
+
+    :param f:
+        The file-like object to sniff.
+
+    :param size:
+        The number of characters to sample. The sample is extended
+        to the end of its last line so that no line is split. If
+        None then the entire file is sampled (and held in memory).
+
+    :returns:
+        A tuple (dialect, lines) where lines iterates over every line
+        of :f:, starting with those consumed by the sample.
+
+    """
+
+    if size is None:
+        sample = f.read()
+    else:
+        sample = f.read(size)
+        if sample and not sample.endswith('\n'):
+            sample += f.readline()
+
+    return dialect_sniff(sample), chain(StringIO(sample), f)
+
+@reader_profiled
+@reader_counted
+def reader_make(file_or_path='-', dialect='sniff', headless=False, sniff_size=SNIFF_SIZE, mmap=False, jobs=1, cache=False, columns=None, prefetch=False):
     """
     Make a reader for CSV files.
 
     :param file_or_path: 
         The file to read from. Default is '-', which denotes STDIN.
-        Can be path to a file or a file-like object.
+        Can be path to a file or a file-like object. Files which are
+        compressed with gzip, bz2 or xz are detected by their magic
+        bytes and decompressed as they are read.
 
     :param dialect: 
         The CSV dialect. Default is 'sniff', which (usually) automatically
-        detects the dialect. However, 'sniff' will load the entire CSV
-        file into memory, which may be unsuitable. Options are 'sniff', 
-        'excel', 'excel-tab', or any Dialect object from the python
-        csv module.
+        detects the dialect from the first :sniff_size: characters, or
+        takes it from the dialect cache if csvu-sniff has sniffed the
+        file since it last changed.
+        Options are 'sniff', 'excel', 'excel-tab', or any Dialect
+        object from the python csv module.
 
     :param headless:
         Whether or not CSV is headless. Default is False. When CSV has
         a header, column names are the values in the first row. When
         CSV is headless, column names are integers 0, 1, 2, et cetera.
 
+    :param sniff_size:
+        The number of characters to sample when :dialect: is 'sniff'.
+        Default is SNIFF_SIZE. If None then the entire CSV file is
+        loaded into memory and sniffed.
+
+    :param mmap:
+        Whether or not to map a regular file into memory. Default is
+        False. When mapped, records are sliced from the file and each
+        row is parsed only when it is used. Ignored for STDIN,
+        file-like objects and dialects with an escapechar.
+
+    :param jobs:
+        The number of processes with which to parse. Default is 1.
+        When greater than 1, a regular file is split into chunks at
+        record boundaries which are parsed in parallel, and the rows
+        are yielded in their original order. Ignored as for :mmap:,
+        and for compressed files.
+
+    :param cache:
+        Whether or not to use a columnar cache of a regular file.
+        Default is False. The cache is a sidecar file next to the
+        CSV file, see :csvu.cache:. If the cache is up to date then
+        rows are read from it, skipping sniffing and parsing. Otherwise
+        the file is streamed and the cache is written as it is read.
+
+    :param prefetch:
+        Whether or not to read the file in a background thread, ahead
+        of the parser. Default is False. This overlaps the latency of
+        reading (and decompressing) the file with the work of the
+        consumer, e.g. with reading another file. Ignored when the
+        file is read with :mmap:, with :jobs: or from a :cache:.
+
+    :param columns:
+        The columns to read. Default is None, which reads every column.
+        Otherwise rows have only :columns:, in the order given, as do
+        the fieldnames, and the other cells are dropped as soon as
+        the row is parsed (or, from a cache, are never loaded).
+
     """
 
+    #
+    # Cache
+    #
+
+    cache_path = None
+
+    if cache and file_or_path != '-' and isinstance(file_or_path, basestring) and os.path.isfile(file_or_path):
+        c = cache_open(file_or_path)
+        if c is not None:
+            if dialect == 'sniff' or dialect_params(dialect) == c.meta['dialect']:
+                stats = stats_current()
+                if stats is not None:
+                    stats.input_add(c)
+                return cache_reader_make(c, headless=headless, columns=columns)
+            c.close()
+        cache_path = file_or_path
+
+    #
+    # Dialect cache
+    #
+
+    if dialect == 'sniff' and file_or_path != '-' and isinstance(file_or_path, basestring):
+        cached = dialect_cache_get(file_or_path)
+        if cached is not None:
+            dialect = cached[0]
+
+    scannable = (
+            (mmap or jobs > 1) 
+            and cache_path is None
+            and file_or_path != '-' 
+            and isinstance(file_or_path, basestring) 
+            and os.path.isfile(file_or_path)
+            and compression_of_file(file_or_path) is None
+        )
+
+    #
+    # Parallel
+    #
+
+    if scannable and jobs > 1:
+        try:
+            return parallel_reader_make(
+                            file_or_path,
+                            dialect=dialect,
+                            headless=headless,
+                            sniff_size=sniff_size,
+                            jobs=jobs,
+                            columns=columns,
+                        )
+        except ValueError:
+            # The dialect cannot be scanned, so stream the file.
+            pass
+
+    #
+    # Memory map
+    #
+
+    if scannable and mmap:
+        try:
+            return mmap_reader_make(
+                            file_or_path,
+                            dialect=dialect,
+                            headless=headless,
+                            sniff_size=sniff_size,
+                            columns=columns,
+                        )
+        except ValueError:
+            # The dialect cannot be scanned, so stream the file.
+            pass
+
     #
     # File
     #
 
-    if file_or_path == '-':
-        f = sys.stdin
-    elif isinstance(file_or_path, basestring):
-        f = open(file_or_path, 'r')
-    else:
-        f = file_or_path
+    f, compression = reader_file_make(file_or_path)
+
+    stats = stats_current()
+    if stats is not None:
+        stats.input_add(f)
 
     #
     # Dialect
     #
 
     if dialect == 'sniff':
-        # read the entire file into memory.
-        f = StringIO(f.read())
-        sample = f.read()
-        f.reset()
-        try:
-            dialect = Sniffer().sniff(sample, delimiters=DELIMITERS)
-        except:
-            dialect = excel
+        dialect, f = sniff_make(f, size=sniff_size)
+
+    if prefetch:
+        f = Prefetch(f)
 
     #
     # Reader
     #
 
+    r = reader(f, dialect=dialect)
+
+    if cache_path is not None:
+        r = cache_build_g(r, cache_path, dialect)
+
     if headless:
-        r = reader(f, dialect=dialect)
         row0 = r.next()
         fieldnames = [str(i) for i, x in enumerate(row0)]
-        def gen():
-            yield {fn: x for fn, x in izip(fieldnames, row0)}
-            for row in r:
-                yield {fn: x for fn, x in izip(fieldnames, row)}
-        return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': gen()}
+        n = len(fieldnames)
+        rows = (row if len(row) <= n else row[:n] for row in chain([row0], r))
     else:
-        r = DictReader(f, dialect=dialect)
-        fieldnames = r.fieldnames
-        def gen():
-            for row in r:
-                yield row
-        return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': gen()}
+        try:
+            fieldnames = r.next()
+        except StopIteration:
+            fieldnames = None
+        rows = ifilter(None, r)
 
-def writer_make(fieldnames, file_or_path='-', dialect='excel', headless=False):
+    if columns is not None:
+        fieldnames, indexes = projection_make(fieldnames, columns)
+        rows = cells_project_g(rows, indexes)
 
-    #
-    # File
-    #
+    return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': row_g_make(rows, fieldnames)}
+
+def cells_g_make(row_g, fieldnames, restval='', strict=True):
+    """
+    Convert rows to lists of cells in the order of :fieldnames:.
+
+    Rows which are lists or tuples are taken to be in the order of
+    :fieldnames: already, as are :Row: objects with the same fieldnames,
+    and are passed through without conversion. Other rows are treated
+    as dictionaries and checked for keys not in :fieldnames:, as does
+    DictWriter.
+
+    :param row_g: The rows to convert.
+    :param fieldnames: The column names.
+    :param restval: The value of keys missing from a row.
+    :param strict: If False then keys not in :fieldnames:, e.g. the
+        surplus cells of a long row, are left out rather than an error.
+    """
+
+    fieldnames_set = set(fieldnames)
+
+    schema = None
+    direct = False
+
+    for row in row_g:
+        if type(row) is list or type(row) is tuple:
+            yield row
+            continue
+        if isinstance(row, Row):
+            cells = row.cells
+            if row.extras is None or not strict:
+                if row.schema is not schema:
+                    schema = row.schema
+                    direct = schema.fieldnames == fieldnames
+                if direct:
+                    yield cells
+                    continue
+        if strict:
+            wrong = [k for k in row if k not in fieldnames_set]
+            if wrong:
+                raise ValueError("dict contains fields not in fieldnames: {}".format(", ".join(repr(k) for k in wrong)))
+        yield [row.get(fn, restval) for fn in fieldnames]
+
+def pretty_text(x):
+    """
+    The lines of a cell of a pretty table, as unicode.
+    """
+    if not isinstance(x, basestring):
+        x = str(x)
+    if not isinstance(x, unicode):
+        x = x.decode('utf-8', 'replace')
+    return x.split('\n')
+
+def pretty_g(cells_g, fieldnames=None, size=PRETTY_SIZE):
+    """
+    Render rows as a human-readable table, one line at a time.
+
+    Column widths are taken from the header and the first :size:
+    rows, so output begins after :size: rows rather than at the
+    end of input. If a later row does not fit then the columns are
+    widened and a border (and the header) is emitted again.
+
+    :param cells_g: The rows, as lists of cells.
+    :param fieldnames: The header, or None for no header.
+    :param size: The number of rows from which to take widths.
+
+    :returns: A generator of lines, as unicode without newlines.
+    """
+
+    sample = [[pretty_text(x) for x in cells] for cells in islice(cells_g, size)]
+
+    header = None
+    if fieldnames is not None:
+        header = [pretty_text(fn) for fn in fieldnames]
+        n = len(header)
+    elif sample:
+        n = len(sample[0])
+    else:
+        n = 0
+
+    widths = [0] * n
+
+    def widen(texts):
+        widened = False
+        for i, lines in enumerate(texts):
+            w = max(len(line) for line in lines)
+            if i < n and w > widths[i]:
+                widths[i] = w
+                widened = True
+        return widened
+
+    def border():
+        return u'+' + u'+'.join(u'-' * (w + 2) for w in widths) + u'+'
+
+    def lines_g(texts):
+        texts = texts + [[u'']] * (n - len(texts))
+        for j in xrange(max(len(lines) for lines in texts) if texts else 1):
+            cells = (lines[j] if j < len(lines) else u'' for lines in texts)
+            yield u'|' + u'|'.join(u' ' + c.ljust(w) + u' ' for c, w in izip(cells, widths)) + u'|'
+
+    def heading_g():
+        yield border()
+        if header is not None:
+            for line in lines_g(header):
+                yield line
+            yield border()
+
+    if header is not None:
+        widen(header)
+    for texts in sample:
+        widen(texts)
+
+    for line in heading_g():
+        yield line
+
+    rest = ([pretty_text(x) for x in cells] for cells in cells_g)
+
+    for texts in chain(sample, rest):
+        if widen(texts):
+            for line in heading_g():
+                yield line
+        for line in lines_g(texts):
+            yield line
+
+    yield border()
+
+def stdout_buffered(buffer_size=BUFFER_SIZE):
+    """
+    A file for writing to the descriptor of STDOUT, but which writes
+    in blocks of :buffer_size: bytes. Closing it leaves STDOUT open.
+    If STDOUT has no descriptor then it is returned as is.
+    """
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, IOError, ValueError):
+        return sys.stdout
+    sys.stdout.flush()
+    return os.fdopen(os.dup(fd), 'wb', buffer_size)
+
+def writer_file_make(file_or_path='-', buffer_size=BUFFER_SIZE, compression=None, compression_level=COMPRESSION_LEVEL):
+    """
+    Open a file to write to, buffered and compressed as by :writer_make:,
+    which takes the same arguments. A file-like object is written to
+    as is, so it is neither buffered nor closed, but it is compressed
+    if :compression: is given.
+
+    The file should be closed once written, which for STDOUT closes
+    only the buffered file.
+    """
 
     if file_or_path == '-':
-        f = sys.stdout
+        f = stdout_buffered(buffer_size)
     elif isinstance(file_or_path, basestring):
-        f = open(file_or_path, 'w')
+        f = open(file_or_path, 'wb', buffer_size)
+        if compression is None:
+            compression = compression_of_path(file_or_path)
     else:
         f = file_or_path
 
+    if compression:
+        f = CompressedFile(
+                    f,
+                    compression,
+                    level=compression_level,
+                    close_raw=writer_file_opened(f, file_or_path),
+                )
+
+    return f
+
+def writer_file_opened(f, file_or_path):
+    """
+    Whether or not :f: was opened by :writer_file_make: for :file_or_path:.
+    """
+    return isinstance(file_or_path, basestring) and f is not sys.stdout
+
+def writer_file_done(f, file_or_path):
+    """
+    Finish writing to :f:, made by :writer_file_make: for :file_or_path:.
+    It is closed if it was opened there, otherwise it is flushed. A
+    compressed stream is always ended, but only closes what it writes
+    to if that was opened there.
+    """
+    if isinstance(f, CompressedFile) or writer_file_opened(f, file_or_path):
+        f.close()
+    else:
+        f.flush()
+
+@writer_profiled
+@writer_counted
+def writer_make(fieldnames, file_or_path='-', dialect='excel', headless=False, buffer_size=BUFFER_SIZE, compression=None, compression_level=COMPRESSION_LEVEL):
+    """
+    Make a writer for CSV files.
+
+    :param fieldnames:
+        The column names, in order.
+
+    :param file_or_path: 
+        The file to write to. Default is '-', which denotes STDOUT.
+        Can be path to a file or a file-like object. Paths and STDOUT
+        are written in blocks of :buffer_size: bytes and closed once
+        written (for STDOUT, a duplicate of its descriptor). File-like
+        objects are written to as they are, and only flushed.
+
+    :param dialect: 
+        The CSV dialect. Default is 'excel'. Options are 'pretty',
+        'excel', 'excel-tab', or any Dialect object from the python
+        csv module.
+
+    :param headless:
+        Whether or not to omit the header. Default is False.
+
+    :param buffer_size:
+        The size in bytes of the blocks in which output is written.
+        Default is BUFFER_SIZE.
+
+    :param compression:
+        One of 'gzip', 'bz2' or 'xz' to compress the output. Default
+        is None, which compresses a path ending in .gz, .bz2 or .xz
+        accordingly and leaves other outputs uncompressed.
+
+    :param compression_level:
+        The compression level, 1 (fastest) to 9 (smallest). Default
+        is COMPRESSION_LEVEL.
+
+    :returns:
+        A function which writes the rows of a generator. Rows may be
+        dictionaries, :Row: objects, or lists of cells in the order
+        of :fieldnames:.
+
+    """
+
+    #
+    # File
+    #
+
+    f = writer_file_make(
+                file_or_path=file_or_path,
+                buffer_size=buffer_size,
+                compression=compression,
+                compression_level=compression_level,
+            )
+
     #
     # Writer
     #
@@ -95,28 +516,29 @@ def writer_make(fieldnames, file_or_path='-', dialect='excel', headless=False):
     if dialect == 'pretty':
         def wf(gen):
 
-            w = None
-
-            if headless:
-                w = PrettyTable(header=False)
-            else:
-                w = PrettyTable(fieldnames)
-
-            for row in gen:
-                w.add_row([row[fn] for fn in fieldnames])
+            lines = pretty_g(
+                            cells_g_make(gen, fieldnames, strict=False),
+                            fieldnames=None if headless else fieldnames,
+                        )
 
-            w.align = 'l'
+            # Show each line as it comes when someone is watching.
+            tty = getattr(f, 'isatty', lambda: False)()
 
-            f.write(w.get_string()) 
-            f.write('\n')
+            for line in lines:
+                f.write(line.encode('utf-8'))
+                f.write('\n')
+                if tty:
+                    f.flush()
+            writer_file_done(f, file_or_path)
 
         return wf
     else:
         def wf(gen):
-            w = DictWriter(f, dialect=dialect, fieldnames=fieldnames)
+            w = writer(f, dialect=dialect)
             if not headless:
-                w.writeheader()
-            w.writerows(row for row in gen)
+                w.writerow(fieldnames)
+            w.writerows(cells_g_make(gen, fieldnames))
+            writer_file_done(f, file_or_path)
 
         return wf
 
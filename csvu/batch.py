@@ -0,0 +1,247 @@
+from itertools import islice
+
+from csvu.row import Row, Schema
+from csvu.util import K_NASTRINGs
+
+BATCH_SIZE = 64 * 1024
+
+def numpy_import():
+    try:
+        import numpy
+    except ImportError:
+        raise Exception("Column batches need numpy, try: pip install numpy")
+    return numpy
+
+def numeric_column_make(np, cells, naset):
+    """
+    Convert :cells: to an array of floats and a mask of the cells
+    which are NA, whose values are NaN.
+
+    :raises ValueError: If a cell is neither NA nor a number.
+    """
+    if None in cells:
+        mask = np.fromiter(
+                    (x is None or x.strip().upper() in naset for x in cells),
+                    dtype=bool,
+                    count=len(cells),
+                )
+        cells = ['nan' if m else x for x, m in zip(cells, mask)]
+        return np.array(cells, dtype=np.float64), mask
+    s = np.char.upper(np.char.strip(np.array(cells, dtype=str)))
+    mask = np.in1d(s, list(naset))
+    return np.where(mask, 'nan', s).astype(np.float64), mask
+
+def isnumeric_first(cells, naset):
+    """
+    Whether the first cell of :cells: which is not NA is a number,
+    which is cheap to tell and rules out most text columns.
+    """
+    for x in cells:
+        if x is None or x.strip().upper() in naset:
+            continue
+        try:
+            float(x)
+        except ValueError:
+            return False
+        return True
+    return True
+
+def columns_make(rows, fieldnames):
+    """
+    The cells of :rows: by column, one list per column of :fieldnames:.
+    """
+    row0 = rows[0]
+    if isinstance(row0, Row) and all(isinstance(row, Row) and row.schema is row0.schema for row in rows):
+        indexes = [row0.schema.index.get(fn) for fn in fieldnames]
+        if not None in indexes:
+            return [[row.cells[j] for row in rows] for j in indexes]
+    return [[row[fn] for row in rows] for fn in fieldnames]
+
+class Batch(object):
+    """
+    A batch of consecutive rows, stored by column.
+
+    Numeric columns are arrays of floats, with a mask of the cells
+    which are NA. Other columns are arrays of objects, and their mask
+    is None. The cells as they were read are kept too, so that the
+    rows of a batch are those it was made from.
+
+    :param fieldnames: The column names.
+    :param columns: The arrays of the columns, in order.
+    :param masks: The NA masks of the columns, in order.
+    :param strings: The cells of the columns, in order.
+    """
+
+    __slots__ = ('fieldnames', 'columns', 'masks', 'strings', 'index')
+
+    def __init__(self, fieldnames, columns, masks, strings):
+        self.fieldnames = fieldnames
+        self.columns = columns
+        self.masks = masks
+        self.strings = strings
+        self.index = {fn: i for i, fn in enumerate(fieldnames)}
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, key):
+        return self.columns[self.index[key]]
+
+    def mask(self, key):
+        return self.masks[self.index[key]]
+
+    def cells(self):
+        """
+        The rows of the batch, as lists of cells as they were read.
+        """
+        return [list(cells) for cells in zip(*self.strings)]
+
+def batch_make(rows, fieldnames, numeric=None, nastrings=K_NASTRINGs):
+    """
+    Make a column batch of a list of rows.
+
+    :param rows: The rows, a non-empty list of :Row: or dictionaries.
+    :param fieldnames: The columns of the batch.
+    :param numeric: The columns to convert to numbers. Default is None,
+        which converts the columns whose cells are all NA or numbers.
+    :param nastrings: Values which are NA, compared after stripping
+        and upper-casing.
+
+    :returns: A :Batch:.
+    """
+
+    np = numpy_import()
+
+    naset = set(x.strip().upper() for x in nastrings)
+
+    strings = columns_make(rows, fieldnames)
+
+    columns = []
+    masks = []
+    for fn, cells in zip(fieldnames, strings):
+        column = None
+        if (fn in numeric) if numeric is not None else isnumeric_first(cells, naset):
+            try:
+                column, mask = numeric_column_make(np, cells, naset)
+            except ValueError as exc:
+                if numeric is not None:
+                    raise Exception("Not a number in column {}: {}".format(fn, exc))
+        if column is None:
+            column = np.empty(len(cells), dtype=object)
+            column[:] = cells
+            mask = None
+        columns.append(column)
+        masks.append(mask)
+
+    return Batch(fieldnames, columns, masks, strings)
+
+def batch_g_make(row_g, fieldnames, size=BATCH_SIZE, numeric=None, nastrings=K_NASTRINGs):
+    """
+    Group rows into column batches.
+
+    :param row_g: The rows, e.g. reader_make(...)['reader'].
+    :param fieldnames: The column names.
+    :param size: The number of rows per batch.
+    :param numeric: The columns to convert to numbers. Default is None,
+        which converts the columns whose cells in the first batch are
+        all NA or numbers. A later cell of a numeric column which is
+        neither NA nor a number is an error.
+    :param nastrings: Values which are NA, compared after stripping
+        and upper-casing.
+
+    :returns: A generator of :Batch:.
+    """
+
+    fieldnames = list(fieldnames or [])
+
+    for c in numeric or []:
+        if not c in fieldnames:
+            raise Exception("Column not found: {}".format(c))
+
+    row_g = iter(row_g)
+
+    while True:
+
+        rows = list(islice(row_g, size))
+        if not rows:
+            return
+
+        batch = batch_make(rows, fieldnames, numeric=numeric, nastrings=nastrings)
+
+        if numeric is None:
+            numeric = [fn for fn, mask in zip(fieldnames, batch.masks) if mask is not None]
+
+        yield batch
+
+def batch_rows_g(batch_g):
+    """
+    Turn column batches back into rows, for tools which work on rows.
+    The cells are those the batches were made from.
+    """
+    schema = None
+    for batch in batch_g:
+        if schema is None:
+            schema = Schema(batch.fieldnames)
+        for cells in batch.cells():
+            yield Row(schema, cells)
+
+def batch_reader_make(size=BATCH_SIZE, numeric=None, nastrings=K_NASTRINGs, **kwargs):
+    """
+    Make a reader of column batches.
+
+    Takes the arguments of :csvu.reader_make:, and those of
+    :batch_g_make:, and returns the same dictionary as reader_make
+    except that 'reader' is a generator of :Batch:.
+    """
+
+    from csvu import reader_make
+
+    reader_d = reader_make(**kwargs)
+
+    reader_d['reader'] = batch_g_make(
+                                reader_d['reader'],
+                                reader_d['fieldnames'],
+                                size=size,
+                                numeric=numeric,
+                                nastrings=nastrings,
+                            )
+
+    return reader_d
+
+def column_sum0(batch_g, column):
+    """
+    The sum of a numeric column over column batches, counting NA as
+    zero, as does csvu.util.sum0.
+
+    :returns: The sum, or None if every cell is NA.
+    """
+    return column_sum0_count(batch_g, column)[0]
+
+def column_mean0(batch_g, column):
+    """
+    The mean of a numeric column over column batches, counting NA as
+    zero, as does csvu.util.mean0.
+
+    :returns: The mean, or None if every cell is NA.
+    """
+    s, n = column_sum0_count(batch_g, column)
+    if s is None:
+        return None
+    return s / n
+
+def column_sum0_count(batch_g, column):
+    s = 0.0
+    n = 0
+    na = True
+    for batch in batch_g:
+        values = batch[column]
+        mask = batch.mask(column)
+        if mask is None:
+            raise Exception("Not a numeric column: {}".format(column))
+        n += len(values)
+        if not mask.all():
+            na = False
+            s += float(values[~mask].sum())
+    if na:
+        return None, n
+    return s, n
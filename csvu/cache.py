@@ -0,0 +1,241 @@
+
+from csv import Dialect, QUOTE_MINIMAL
+from itertools import izip
+import marshal
+import os
+import struct
+
+from csvu.records import dialect_params
+from csvu.row import Row, Schema, projection_make
+
+CACHE_SUFFIX = '.csvu'
+
+CACHE_MAGIC = 'CSVU-CACHE-1\n'
+
+CACHE_BLOCK_ROWS = 64 * 1024
+
+FOOTER = struct.Struct('<Q')
+
+def cache_path_of(path):
+    return path + CACHE_SUFFIX
+
+def source_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime]
+
+def dialect_of_params(params):
+    """
+    A Dialect class with the format parameters :params:.
+    """
+    class cached(Dialect):
+        quoting = QUOTE_MINIMAL
+    for k, v in params.iteritems():
+        setattr(cached, k, v)
+    return cached
+
+class Cache(object):
+    """
+    A columnar cache of a CSV file.
+
+    The cache is a sidecar file of blocks of CACHE_BLOCK_ROWS records.
+    Each block stores each column separately, so a column can be
+    loaded without the others. Every record, the header included,
+    is stored, and only rectangular files are cached.
+
+    :param path: The path to the cache file.
+    :param meta: The footer of the cache file.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.f = open(path, 'rb')
+        self.dialect = dialect_of_params(meta['dialect'])
+        # The end of the last column read by :chunk:, see :tell:.
+        self.position = 0
+
+    def chunk(self, b, j):
+        """
+        The cells of column :j: of block :b:.
+        """
+        offset, length = self.meta['blocks'][b][j]
+        self.f.seek(offset)
+        self.position = offset + length
+        return marshal.loads(self.f.read(length))
+
+    def fileno(self):
+        return self.f.fileno()
+
+    def tell(self):
+        """
+        The offset up to which the cache has been read, as a file's
+        position, so that --stats can measure it.
+        """
+        return self.position
+
+    def block(self, b, indexes=None):
+        """
+        The records of block :b:, as lists of cells. If :indexes: are
+        given then only those columns are loaded.
+        """
+        if indexes is None:
+            indexes = xrange(self.meta['n'])
+        columns = [self.chunk(b, j) for j in indexes]
+        return map(list, izip(*columns))
+
+    def close(self):
+        self.f.close()
+
+def cache_open(path):
+    """
+    Open the cache of the CSV file at :path:.
+
+    :returns: A :Cache:, or None if there is no cache or the file
+        has changed since it was cached.
+    """
+
+    cache_path = cache_path_of(path)
+
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            f.seek(-FOOTER.size, os.SEEK_END)
+            end = f.tell()
+            offset, = FOOTER.unpack(f.read(FOOTER.size))
+            f.seek(offset)
+            meta = marshal.loads(f.read(end - offset))
+    except (IOError, OSError, EOFError, ValueError, struct.error):
+        return None
+
+    if meta.get('source') != source_key(path):
+        return None
+
+    return Cache(cache_path, meta)
+
+def cache_reader_make(cache, headless=False, columns=None):
+    """
+    Make a reader from a :Cache:, as does :csvu.reader_make:.
+    If :columns: are given then only they are loaded.
+    """
+
+    meta = cache.meta
+    nblocks = len(meta['blocks'])
+
+    if nblocks == 0:
+        cache.close()
+        if headless:
+            raise StopIteration
+        return {'dialect': cache.dialect, 'fieldnames': None, 'reader': iter([])}
+
+    row0 = [cache.chunk(0, j)[0] for j in xrange(cache.meta['n'])]
+
+    if headless:
+        fieldnames = [str(i) for i, x in enumerate(row0)]
+    else:
+        fieldnames = row0
+
+    indexes = None
+    if columns is not None:
+        fieldnames, indexes = projection_make(fieldnames, columns)
+
+    rows0 = cache.block(0, indexes)
+    if not headless:
+        rows0 = rows0[1:]
+
+    schema = Schema(fieldnames, dialect=cache.dialect)
+
+    def gen():
+        for b in xrange(nblocks):
+            rows = rows0 if b == 0 else cache.block(b, indexes)
+            for cells in rows:
+                yield Row(schema, cells)
+        cache.close()
+
+    return {'dialect': cache.dialect, 'fieldnames': fieldnames, 'reader': gen()}
+
+def cache_build_g(records, path, dialect, block_rows=CACHE_BLOCK_ROWS):
+    """
+    Pass records through while writing the cache of the CSV file at
+    :path:. The cache is only written if every record is read and
+    every record has as many cells as the first. If the cache cannot
+    be written, e.g. because the directory of :path: is read-only,
+    then the records are passed through all the same.
+
+    :param records: The records of the file, as lists of cells.
+    :param path: The path to the CSV file.
+    :param dialect: The dialect of the CSV file.
+    """
+
+    cache_path = cache_path_of(path)
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+
+    meta = {
+            'source' : source_key(path),
+            'dialect': dialect_params(dialect),
+            'blocks' : [],
+            'rows'   : [],
+            'n'      : None,
+        }
+
+    try:
+        f = open(tmp_path, 'wb')
+        f.write(CACHE_MAGIC)
+    except (IOError, OSError):
+        for record in records:
+            yield record
+        return
+
+    def flush(rows):
+        index = []
+        for column in zip(*rows):
+            s = marshal.dumps(list(column))
+            index.append((f.tell(), len(s)))
+            f.write(s)
+        meta['blocks'].append(index)
+        meta['rows'].append(len(rows))
+
+    rows = []
+    # Set when the file is ragged or the cache cannot be written.
+    failed = False
+    done = False
+
+    try:
+        for record in records:
+            if not failed:
+                if meta['n'] is None:
+                    meta['n'] = len(record)
+                if len(record) == meta['n']:
+                    # Copied, since consumers may change the record.
+                    rows.append(tuple(record))
+                else:
+                    failed = True
+                    rows = []
+            yield record
+            if len(rows) >= block_rows:
+                try:
+                    flush(rows)
+                except (IOError, OSError):
+                    failed = True
+                rows = []
+        if failed:
+            return
+        try:
+            if rows:
+                flush(rows)
+            offset = f.tell()
+            f.write(marshal.dumps(meta))
+            f.write(FOOTER.pack(offset))
+            f.close()
+            os.rename(tmp_path, cache_path)
+            done = True
+        except (IOError, OSError):
+            pass
+    finally:
+        if not done:
+            try:
+                f.close()
+                os.remove(tmp_path)
+            except (IOError, OSError):
+                pass
+
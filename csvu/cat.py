@@ -8,7 +8,13 @@ from csvu import (
         writer_make,
     )
 
-from csvu.cli import default_arg_parser
+from csvu.cli import (
+        default_arg_parser,
+        default_arg_cache,
+        default_arg_jobs,
+        default_arg_mmap,
+        default_arg_sniff_size,
+    )
 
 def cli_arg_parser():
     
@@ -35,6 +41,10 @@ def cli_arg_parser():
             required=True,
             help='''The CSV files to cat.'''
         )
+    default_arg_sniff_size(parser)
+    default_arg_mmap(parser)
+    default_arg_jobs(parser)
+    default_arg_cache(parser)
     return parser
 
 def filter_d(rows_g, fieldnames):
@@ -67,6 +77,10 @@ def cli():
             reader_d = reader_make(
                             file_or_path=fname,
                             dialect='sniff',
+                            sniff_size=args.sniff_size,
+                            mmap=args.mmap,
+                            jobs=args.jobs,
+                            cache=args.cache,
                             headless=args.headless,
                         )
             fieldnames.append(reader_d['fieldnames'])
@@ -82,6 +96,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=args.dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames1,
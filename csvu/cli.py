@@ -22,6 +22,47 @@ def nonnegative_int(x):
         m = "Not a nonnegative integer: '{}'".format(x)
         raise argparse.ArgumentTypeError(m)
 
+BYTE_SIZE_SUFFIXES = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+def byte_size(x):
+    """
+    Parse a positive number of bytes with an optional suffix K, M, G
+    or T, as does GNU sort, e.g. 512M.
+    """
+    try:
+        s = x.strip().upper()
+        if s.endswith('B'):
+            s = s[:-1]
+        u = s[-1:] if s[-1:] in BYTE_SIZE_SUFFIXES else ''
+        y = int(float(s[:len(s) - len(u)]) * BYTE_SIZE_SUFFIXES[u])
+        if y < 1:
+            raise None
+        return y
+    except:
+        m = "Not a size in bytes: '{}'".format(x)
+        raise argparse.ArgumentTypeError(m)
+
+def row_range(x):
+    """
+    Parse START:STOP, START: or :STOP into a tuple (start, stop) of
+    row numbers, from 0, where stop is None for the last row. A single
+    row number N is the range N:N+1.
+    """
+    try:
+        if ':' in x:
+            start, stop = x.split(':')
+            start = int(start) if start else 0
+            stop = int(stop) if stop else None
+        else:
+            start = int(x)
+            stop = start + 1
+        if start < 0 or (stop is not None and stop < start):
+            raise None
+        return start, stop
+    except:
+        m = "Not a row range START:STOP: '{}'".format(x)
+        raise argparse.ArgumentTypeError(m)
+
 def default_arg_debug(parser):
 
     parser.add_argument(
@@ -31,6 +72,74 @@ def default_arg_debug(parser):
             help='''Use this flag when debugging these scripts.''',
         )
 
+def default_arg_profile(parser):
+
+    from csvu.profiling import profile_start
+
+    class ProfileAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            setattr(namespace, self.dest, values or True)
+            profile_start(path=values or None)
+
+    parser.add_argument(
+            '--profile',
+            nargs=0,
+            default=False,
+            action=ProfileAction,
+            help='''Time the sniff, read, filter and write stages
+                    and profile the tool with cProfile. The breakdown
+                    by stage and the top of the profile are written
+                    to STDERR on exit.''',
+        )
+
+    parser.add_argument(
+            '--profile-out',
+            metavar='PATH',
+            default=None,
+            action=ProfileAction,
+            help='''Like --profile, but write the pstats of the
+                    profile to PATH instead of its top to STDERR.''',
+        )
+
+def positive_float(x):
+    try:
+        y = float(x)
+        if not (y > 0):
+            raise None
+        return y
+    except:
+        m = "Not a positive number: '{}'".format(x)
+        raise argparse.ArgumentTypeError(m)
+
+def default_arg_stats(parser):
+
+    from csvu.stats import STATS_INTERVAL, stats_start
+
+    class StatsAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            setattr(namespace, self.dest, values or True)
+            stats_start(interval=values or None)
+
+    parser.add_argument(
+            '--stats',
+            nargs=0,
+            default=False,
+            action=StatsAction,
+            help='''Report the rows read and written, the bytes read,
+                    the throughput and, if the size of the input is
+                    known, an ETA to STDERR every --stats-interval
+                    seconds, and a summary as a line of JSON on exit.''',
+        )
+
+    parser.add_argument(
+            '--stats-interval',
+            metavar='SECONDS',
+            type=positive_float,
+            default=STATS_INTERVAL,
+            action=StatsAction,
+            help='''Like --stats, every SECONDS seconds.''',
+        )
+
 def default_arg_headless(parser):
 
     parser.add_argument(
@@ -40,6 +149,49 @@ def default_arg_headless(parser):
             help='''Use this flag if there is no header.''',
         )
 
+def default_arg_sniff_size(parser):
+
+    from csvu import SNIFF_SIZE
+
+    parser.add_argument(
+            '--sniff-size',
+            type=positive_int,
+            default=SNIFF_SIZE,
+            help='''The number of characters to use when sniffing
+                    the dialect of an input.''',
+        )
+
+def default_arg_mmap(parser):
+
+    parser.add_argument(
+            '--mmap',
+            default=False,
+            action='store_true',
+            help='''Map input files into memory and parse each
+                    row only when it is used. Ignored for STDIN.''',
+        )
+
+def default_arg_jobs(parser):
+
+    parser.add_argument(
+            '--jobs',
+            type=positive_int,
+            default=1,
+            help='''The number of processes with which to parse
+                    input files. Ignored for STDIN.''',
+        )
+
+def default_arg_cache(parser):
+
+    parser.add_argument(
+            '--cache',
+            default=False,
+            action='store_true',
+            help='''Read input files from their columnar cache,
+                    writing the cache first if it is missing or
+                    out of date. Ignored for STDIN.''',
+        )
+
 def default_arg_dialect0(parser):
 
     parser.add_argument(
@@ -50,10 +202,8 @@ def default_arg_dialect0(parser):
                     Option *sniff* detects the dialect, 
                     *excel* dialect uses commas, 
                     *excel-tab* uses tabs.
-                    Note that *sniff* will load the
-                    entire file into memory, so for large
-                    files it may be better to explicitly
-                    specify the dialect.
+                    Note that *sniff* only inspects the
+                    first --sniff-size characters.
                     '''
         )
 
@@ -67,10 +217,8 @@ def default_arg_dialect1_as_input(parser):
                     Option *sniff* detects the dialect, 
                     *excel* dialect uses commas, 
                     *excel-tab* uses tabs.
-                    Note that *sniff* will load the
-                    entire file into memory, so for large
-                    files it may be better to explicitly
-                    specify the dialect.
+                    Note that *sniff* only inspects the
+                    first --sniff-size characters.
                     '''
         )
 
@@ -103,6 +251,38 @@ def default_arg_dialect2(parser):
                     '''
         )
 
+def compression_level(x):
+    try:
+        y = int(x)
+        if not (1 <= y <= 9):
+            raise None
+        return y
+    except:
+        m = "Not a compression level from 1 to 9: '{}'".format(x)
+        raise argparse.ArgumentTypeError(m)
+
+def default_arg_compression(parser):
+
+    from csvu.compress import COMPRESSIONS, COMPRESSION_LEVEL
+
+    parser.add_argument(
+            '--compression',
+            default=None,
+            choices=COMPRESSIONS,
+            help='''Compress the output. By default an output path
+                    ending in .gz, .bz2 or .xz is compressed accordingly
+                    and other outputs are not compressed. Compressed
+                    inputs are always detected.''',
+        )
+
+    parser.add_argument(
+            '--compression-level',
+            type=compression_level,
+            default=COMPRESSION_LEVEL,
+            help='''The compression level of the output,
+                    1 (fastest) to 9 (smallest).''',
+        )
+
 def default_arg_file0(parser):
 
     parser.add_argument(
@@ -177,6 +357,12 @@ def default_arg_parser(
     if dialect2:
         default_arg_dialect2(parser)
 
+    if dialect0 or dialect1 == 'input':
+        default_arg_sniff_size(parser)
+        default_arg_mmap(parser)
+        default_arg_jobs(parser)
+        default_arg_cache(parser)
+
     if file0:
         default_arg_file0(parser)
 
@@ -205,7 +391,12 @@ def default_arg_parser(
     if file2:
         default_arg_file2(parser)
 
+    if file1 == 'output' or file2:
+        default_arg_compression(parser)
+
     default_arg_debug(parser)
+    default_arg_profile(parser)
+    default_arg_stats(parser)
 
     return parser
 
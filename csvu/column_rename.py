@@ -7,6 +7,7 @@ from csvu import (
     )
 
 from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
 
 def cli_arg_parser():
 
@@ -48,9 +49,11 @@ def filter_d(row_g, fieldnames, renames):
             raise Exception('Rename would result in a duplicate column: {}'.format(fn))
         fieldnames1_set.add(fn)
 
+    schema1 = Schema(fieldnames1)
+
     def g():
         for row in row_g:
-            yield {renames_d.get(k, k): v for k, v in row.iteritems()}
+            yield Row(schema1, [row.get(fn) for fn in fieldnames])
 
     return {'fieldnames': fieldnames1, 'generator': g()}
 
@@ -65,6 +68,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                     )
 
         dialect0   = reader_d['dialect']
@@ -87,6 +94,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         fieldnames=fieldnames1,
                     )
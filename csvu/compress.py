@@ -0,0 +1,256 @@
+
+import io
+import os
+import sys
+import zlib
+
+BLOCK_SIZE = 256 * 1024
+
+COMPRESSIONS = ['gzip', 'bz2', 'xz',]
+
+COMPRESSION_LEVEL = 6
+
+MAGICS = [
+        ('\x1f\x8b', 'gzip'),
+        ('BZh', 'bz2'),
+        ('\xfd7zXZ\x00', 'xz'),
+    ]
+
+EXTENSIONS = {
+        '.gz'  : 'gzip',
+        '.gzip': 'gzip',
+        '.bz2' : 'bz2',
+        '.xz'  : 'xz',
+    }
+
+def lzma_import():
+    try:
+        import lzma
+    except ImportError:
+        try:
+            from backports import lzma
+        except ImportError:
+            raise Exception("xz compression needs the lzma module, try: pip install backports.lzma")
+    return lzma
+
+def decompressor_make(compression):
+    if compression == 'gzip':
+        # 16 + MAX_WBITS expects a gzip header and trailer.
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif compression == 'bz2':
+        import bz2
+        return bz2.BZ2Decompressor()
+    elif compression == 'xz':
+        return lzma_import().LZMADecompressor()
+    raise Exception("Unknown compression: {}".format(compression))
+
+def compressor_make(compression, level=COMPRESSION_LEVEL):
+    if compression == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif compression == 'bz2':
+        import bz2
+        return bz2.BZ2Compressor(level)
+    elif compression == 'xz':
+        return lzma_import().LZMACompressor(preset=level)
+    raise Exception("Unknown compression: {}".format(compression))
+
+def compression_of_magic(magic):
+    for m, compression in MAGICS:
+        if magic.startswith(m):
+            return compression
+    return None
+
+def compression_of_path(path):
+    root, ext = os.path.splitext(path)
+    return EXTENSIONS.get(ext.lower())
+
+class DecompressedFile(object):
+    """
+    A file-like object which decompresses a stream as it is read.
+
+    Concatenated streams, as written by e.g. `cat a.gz b.gz`, are
+    read one after another. Only reading is supported, and the raw
+    file need not be seekable, so STDIN works.
+
+    :param raw: The compressed file.
+    :param compression: One of COMPRESSIONS.
+    """
+
+    def __init__(self, raw, compression, block_size=BLOCK_SIZE):
+        self.raw = raw
+        self.compression = compression
+        self.block_size = block_size
+        self.d = decompressor_make(compression)
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _decompress(self, data):
+        out = []
+        while data:
+            try:
+                out.append(self.d.decompress(data))
+            except EOFError:
+                # The previous stream ended exactly at a block boundary.
+                self.d = decompressor_make(self.compression)
+                continue
+            data = self.d.unused_data
+            if data:
+                self.d = decompressor_make(self.compression)
+        return ''.join(out)
+
+    def _fill(self):
+        while not self.eof:
+            data = self.raw.read(self.block_size)
+            if not data:
+                self.eof = True
+                break
+            out = self._decompress(data)
+            if out:
+                self.buf = self.buf[self.pos:] + out
+                self.pos = 0
+                return True
+        return False
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            while self._fill():
+                pass
+            s = self.buf[self.pos:]
+            self.buf = ''
+            self.pos = 0
+            return s
+        while len(self.buf) - self.pos < n and self._fill():
+            pass
+        s = self.buf[self.pos:self.pos + n]
+        self.pos += len(s)
+        return s
+
+    def readline(self):
+        start = self.pos
+        while True:
+            i = self.buf.find('\n', start)
+            if i >= 0:
+                s = self.buf[self.pos:i + 1]
+                self.pos = i + 1
+                return s
+            start = len(self.buf) - self.pos
+            if not self._fill():
+                s = self.buf[self.pos:]
+                self.buf = ''
+                self.pos = 0
+                return s
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def close(self):
+        self.raw.close()
+
+class CompressedFile(object):
+    """
+    A file-like object which compresses what is written to it.
+
+    Writes are gathered into blocks of :block_size: bytes before
+    being compressed. :flush: writes out what has been written so
+    far, as far as the compression allows, and writing may go on
+    after it. The stream is only complete once :close: has been
+    called.
+
+    :param raw: The file to write the compressed stream to.
+    :param compression: One of COMPRESSIONS.
+    :param level: The compression level, 1 (fastest) to 9 (smallest).
+    :param close_raw: Whether or not :close: also closes :raw:,
+        otherwise it is flushed.
+    """
+
+    def __init__(self, raw, compression, level=COMPRESSION_LEVEL, block_size=BLOCK_SIZE, close_raw=True):
+        self.raw = raw
+        self.compression = compression
+        self.c = compressor_make(compression, level)
+        self.block_size = block_size
+        self.close_raw = close_raw
+        self.pending = []
+        self.n = 0
+
+    def _compress(self):
+        if self.pending:
+            self.raw.write(self.c.compress(''.join(self.pending)))
+            self.pending = []
+            self.n = 0
+
+    def write(self, s):
+        if self.c is None:
+            raise ValueError("I/O operation on closed file")
+        self.pending.append(s)
+        self.n += len(s)
+        if self.n >= self.block_size:
+            self._compress()
+
+    def flush(self):
+        if self.c is None:
+            return
+        self._compress()
+        # Only zlib can flush without ending the stream, bz2 and xz
+        # hold what they have until :close:.
+        if self.compression == 'gzip':
+            self.raw.write(self.c.flush(zlib.Z_SYNC_FLUSH))
+        self.raw.flush()
+
+    def close(self):
+        if self.c is None:
+            return
+        self._compress()
+        self.raw.write(self.c.flush())
+        self.c = None
+        if self.close_raw:
+            self.raw.close()
+        else:
+            self.raw.flush()
+
+def reader_file_make(file_or_path):
+    """
+    Open a file for reading, decompressing it if its magic bytes
+    say that it is compressed.
+
+    :param file_or_path: '-' for STDIN, a path, or a file-like object.
+        File-like objects without a *peek* method are not inspected.
+
+    :returns: A tuple (f, compression), where :compression: is None
+        if the file is not compressed.
+    """
+
+    if file_or_path == '-':
+        try:
+            raw = io.open(sys.stdin.fileno(), 'rb', closefd=False)
+        except (AttributeError, IOError, ValueError):
+            return sys.stdin, None
+    elif isinstance(file_or_path, basestring):
+        raw = io.open(file_or_path, 'rb')
+    else:
+        raw = file_or_path
+
+    peek = getattr(raw, 'peek', None)
+    if peek is None:
+        return raw, None
+
+    compression = compression_of_magic(peek(8)[:8])
+
+    if compression is None:
+        return raw, None
+
+    return DecompressedFile(raw, compression), compression
+
+def compression_of_file(path):
+    """
+    The compression of the file at :path:, by its magic bytes.
+    """
+    with open(path, 'rb') as f:
+        return compression_of_magic(f.read(8))
+
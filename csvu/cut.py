@@ -7,6 +7,7 @@ from csvu import (
     )
 
 from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
 
 def cli_arg_parser():
     
@@ -65,9 +66,12 @@ def filter_d(row_g, fieldnames, columns, renames, negate=False):
 
     fieldnames1 = [r for c, r in renames]
 
+    schema1 = Schema(fieldnames1)
+    columns1 = [c for c, r in renames]
+
     def g():
         for row in row_g:
-            yield {r: row[c] for c, r in renames if r in fieldnames1}
+            yield Row(schema1, [row[c] for c in columns1])
 
     return {'fieldnames': fieldnames1, 'generator': g()}
 
@@ -83,11 +87,22 @@ def cli():
     if args.rename and args.negate:
         parser.error("negate and rename is not defined")
 
+    # Without negate only the cut columns are needed, so the
+    # reader can drop the others as soon as each row is parsed.
+    columns0 = None
+    if not args.negate:
+        columns0 = [c for c, r in args.rename or []] + (args.columns or [])
+
     try:
 
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        columns=columns0,
                         headless=args.headless,
                     )
 
@@ -113,6 +128,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames1,
@@ -31,6 +31,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                         headless=args.headless,
                     )
 
@@ -45,6 +49,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames,
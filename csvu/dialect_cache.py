@@ -0,0 +1,79 @@
+
+import hashlib
+import marshal
+import os
+
+from csvu.cache import dialect_of_params, source_key
+from csvu.records import dialect_params
+
+def dialect_cache_dir():
+    """
+    The directory of the dialect cache, which is $CSVU_DIALECT_CACHE
+    if set, else csvu/dialects in $XDG_CACHE_HOME or ~/.cache.
+    """
+    d = os.environ.get('CSVU_DIALECT_CACHE')
+    if d:
+        return d
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'csvu', 'dialects')
+
+def dialect_cache_path(path):
+    path = os.path.realpath(path)
+    return os.path.join(dialect_cache_dir(), hashlib.sha1(path).hexdigest())
+
+def dialect_cache_get(path):
+    """
+    Look up the dialect of the CSV file at :path: in the dialect cache.
+
+    :returns: A tuple (dialect, fieldnames), or None if the file has
+        not been sniffed or has changed since.
+    """
+
+    try:
+        with open(dialect_cache_path(path), 'rb') as f:
+            d = marshal.load(f)
+        key = source_key(path)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if d.get('path') != os.path.realpath(path) or d.get('source') != key:
+        return None
+
+    return dialect_of_params(d['dialect']), d['fieldnames']
+
+def dialect_cache_put(path, dialect, fieldnames):
+    """
+    Store the dialect and fieldnames of the CSV file at :path: in the
+    dialect cache, keyed by its path, size and mtime. Nothing is
+    stored if the cache cannot be written.
+    """
+
+    d = {
+            'path'      : os.path.realpath(path),
+            'source'    : source_key(path),
+            'dialect'   : dialect_params(dialect),
+            'fieldnames': fieldnames,
+        }
+
+    cache_path = dialect_cache_path(path)
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+
+    # The cache is only a hint, so a cache which cannot be written,
+    # e.g. in a read-only home, is skipped as one which cannot be read.
+    try:
+        directory = os.path.dirname(cache_path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Made by another process in the meantime.
+                if not os.path.isdir(directory):
+                    raise
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(d, f)
+        os.rename(tmp_path, cache_path)
+    except (IOError, OSError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
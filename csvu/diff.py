@@ -10,6 +10,7 @@ from csvu import (
         writer_make,
     )
 from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
 from csvu.util import (
         equal0,
         isna,
@@ -115,9 +116,11 @@ def filter_d(row0_g, row1_g, fieldnames0, fieldnames1, keyname=None, compact=Fal
             elif any(row[fn] for row in rows):
                 keeps.append(fn)
 
+        schema = Schema(keeps)
+
         def diff_g2():
             for row in rows:
-                yield {fn: row[fn] for fn in keeps}
+                yield Row(schema, [row[fn] for fn in keeps])
 
         return {'fieldnames': keeps, 'generator': diff_g2()}
 
@@ -137,12 +140,22 @@ def cli():
         reader0_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        prefetch=True,
                         headless=args.headless,
                     )
 
         reader1_d = reader_make(
                         file_or_path=args.file1,
                         dialect=args.dialect1,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        prefetch=True,
                         headless=args.headless,
                     )
 
@@ -181,6 +194,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file2,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect2,
                         headless=args.headless,
                         fieldnames=fieldnames2,
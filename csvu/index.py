@@ -0,0 +1,62 @@
+
+import os
+import traceback
+
+from csvu.cli import (
+        default_arg_dialect0,
+        default_arg_parser,
+        default_arg_sniff_size,
+        positive_int,
+    )
+from csvu.offsets import INDEX_STRIDE, index_build
+
+def cli_arg_parser():
+
+    description = '''CSVU Index writes a sidecar index of the byte offsets
+                     of the rows of a CSV file, with which csvu-slice
+                     seeks straight to a range of rows.'''
+
+    parser = default_arg_parser(
+                    description=description,
+                    file0='input',
+                    headless=True,
+                )
+
+    default_arg_dialect0(parser)
+    default_arg_sniff_size(parser)
+
+    parser.add_argument(
+            '--stride',
+            type=positive_int,
+            default=INDEX_STRIDE,
+            help='''Index the offset of every :stride:-th row. The
+                    index is :stride: times smaller, and at most
+                    :stride: - 1 rows are scanned to find a row.''',
+        )
+
+    return parser
+
+def cli():
+
+    parser = cli_arg_parser()
+
+    args = parser.parse_args()
+
+    try:
+
+        if args.file0 == '-' or not os.path.isfile(args.file0):
+            raise Exception("Can only index a regular file: {}".format(args.file0))
+
+        index_build(
+                args.file0,
+                dialect=args.dialect0,
+                headless=args.headless,
+                sniff_size=args.sniff_size,
+                stride=args.stride,
+            )
+
+    except Exception as exc:
+
+        m = traceback.format_exc()
+        parser.error(m)
+
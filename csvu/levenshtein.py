@@ -1,7 +1,6 @@
 
 from copy import copy
 from operator import itemgetter
-from pyxdameraulevenshtein import damerau_levenshtein_distance
 import traceback
 
 from csvu import (
@@ -54,6 +53,8 @@ def cli_arg_parser():
 
 def filter_d(row_g, fieldnames, column, target, sort, string, debug=False):
 
+    from pyxdameraulevenshtein import damerau_levenshtein_distance
+
     fieldnames1 = copy(fieldnames)
 
     if not target in fieldnames1:
@@ -91,6 +92,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                         headless=args.headless,
                     )
 
@@ -121,6 +126,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames1,
@@ -0,0 +1,62 @@
+
+import importlib
+import sys
+
+TOOLS = [
+        'cat',
+        'column-rename',
+        'cut',
+        'dialect',
+        'diff',
+        'grep',
+        'head',
+        'index',
+        'levenshtein',
+        'pipe',
+        'pretty',
+        'put',
+        'rank',
+        'row-reduce',
+        'slice',
+        'sniff',
+        'sort',
+        'tail',
+        'tr',
+        'transpose',
+        'update',
+        'xlsx-to-csv',
+    ]
+
+def usage():
+    return '''usage: csvu TOOL [ARGS ...]
+
+CSVU runs csvu-TOOL with ARGS, loading only the modules TOOL needs.
+Use csvu TOOL --help for the arguments of TOOL.
+
+tools: {}
+'''.format(', '.join(TOOLS))
+
+def module_of(tool):
+    return 'csvu.' + tool.replace('-', '_')
+
+def cli():
+
+    argv = sys.argv[1:]
+
+    if not argv or argv[0] in ('-h', '--help'):
+        sys.stdout.write(usage())
+        sys.exit(0)
+
+    tool = argv[0]
+
+    if not tool in TOOLS:
+        sys.stderr.write(usage())
+        sys.stderr.write('csvu: error: unknown tool: {}\n'.format(tool))
+        sys.exit(2)
+
+    # The tools take their program name from argv[0].
+    sys.argv = ['csvu-' + tool] + argv[1:]
+
+    module = importlib.import_module(module_of(tool))
+
+    module.cli()
@@ -0,0 +1,363 @@
+
+from csv import Error, reader
+from itertools import islice
+import marshal
+import os
+import struct
+
+from csvu.cache import dialect_of_params, source_key
+from csvu.compress import compression_of_file
+from csvu.profiling import reader_profiled
+from csvu.records import (
+        MappedFile,
+        cells_parse,
+        closing_g,
+        dialect_params,
+        isblank,
+        quotechar_of,
+        record_spans,
+        record_tail,
+    )
+from csvu.row import row_g_make
+from csvu.stats import reader_counted
+
+INDEX_SUFFIX = '.csvu-index'
+
+INDEX_MAGIC = 'CSVU-INDEX-1\n'
+
+# The number of rows per entry of an index.
+INDEX_STRIDE = 64
+
+ENTRY = struct.Struct('<Q')
+
+FOOTER = struct.Struct('<Q')
+
+def index_path_of(path):
+    return path + INDEX_SUFFIX
+
+class Index(object):
+    """
+    A row-offset index of a CSV file.
+
+    The index is a sidecar file of the byte offsets of every
+    :stride:-th row, as fixed-width entries, so the offset of any
+    row is found with one seek and at most :stride: - 1 records
+    are scanned past to reach it. Rows are numbered from 0, after
+    the header, as they are by :csvu.reader_make:.
+
+    :param path: The path to the index file.
+    :param meta: The footer of the index file.
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.f = open(path, 'rb')
+        self.dialect = dialect_of_params(meta['dialect'])
+        self.rows = meta['rows']
+        self.stride = meta['stride']
+
+    def entry(self, k):
+        """
+        The byte offset of row :k: * stride.
+        """
+        self.f.seek(len(INDEX_MAGIC) + k * ENTRY.size)
+        offset, = ENTRY.unpack(self.f.read(ENTRY.size))
+        return offset
+
+    def locate(self, i):
+        """
+        Find row :i:.
+
+        :returns: A tuple (offset, skip), where :skip: is the number of
+            rows from :offset: to row :i:.
+        """
+        k = i // self.stride
+        return self.entry(k), i - k * self.stride
+
+    def close(self):
+        self.f.close()
+
+def index_open(path, dialect='sniff', headless=False):
+    """
+    Open the index of the CSV file at :path:.
+
+    :returns: An :Index:, or None if there is no index, the file has
+        changed since it was indexed, or it was indexed with another
+        :dialect: (unless it is 'sniff') or as not :headless:.
+    """
+
+    index_path = index_path_of(path)
+
+    try:
+        with open(index_path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                return None
+            f.seek(-FOOTER.size, os.SEEK_END)
+            end = f.tell()
+            offset, = FOOTER.unpack(f.read(FOOTER.size))
+            f.seek(offset)
+            meta = marshal.loads(f.read(end - offset))
+    except (IOError, OSError, EOFError, ValueError, struct.error):
+        return None
+
+    if meta.get('source') != source_key(path) or meta['headless'] != headless:
+        return None
+
+    if dialect != 'sniff' and dialect_params(dialect) != meta['dialect']:
+        return None
+
+    return Index(index_path, meta)
+
+def index_build(path, dialect='sniff', headless=False, sniff_size=None, stride=INDEX_STRIDE):
+    """
+    Write the index of the CSV file at :path:.
+
+    Records are found as by :csvu.records.MappedFile.spans:, so quoted
+    fields may contain newlines and every boundary is one which the
+    csv module agrees with. If the file is not valid CSV then no index
+    is written. Unless :headless:, the header is
+    not a row and blank records are skipped, as they are by
+    :csvu.reader_make:.
+
+    :param path: The path to a regular, uncompressed CSV file.
+    :param dialect: The CSV dialect, or 'sniff'.
+    :param headless: Whether or not the CSV file is headless.
+    :param sniff_size: The number of characters to sniff.
+    :param stride: The number of rows per entry of the index.
+
+    :returns: The number of rows indexed.
+    """
+
+    from csvu import dialect_sniff
+
+    if compression_of_file(path) is not None:
+        raise Exception("Cannot index a compressed file: {}".format(path))
+
+    m = MappedFile(path)
+
+    try:
+
+        if dialect == 'sniff':
+            dialect = dialect_sniff(m.sample(sniff_size))
+
+        try:
+            quotechar = quotechar_of(dialect)
+        except ValueError as exc:
+            raise Exception("Cannot index {}: {}".format(path, exc))
+
+        meta = {
+                'source'  : source_key(path),
+                'dialect' : dialect_params(dialect),
+                'headless': headless,
+                'stride'  : stride,
+                'rows'    : 0,
+            }
+
+        spans = m.spans(quotechar=quotechar, dialect=dialect)
+
+        index_path = index_path_of(path)
+        tmp_path = '{}.{}.tmp'.format(index_path, os.getpid())
+
+        done = False
+
+        f = open(tmp_path, 'wb')
+
+        try:
+            f.write(INDEX_MAGIC)
+            if not headless:
+                for s, e in spans:
+                    break
+            buf = m.buf
+            pack = ENTRY.pack
+            entries = []
+            n = 0
+            for s, e in spans:
+                # Only a record of at most 2 bytes may be blank.
+                if not headless and e - s <= 2 and isblank(buf[s:e]):
+                    continue
+                if not n % stride:
+                    entries.append(pack(s))
+                    if len(entries) >= 64 * 1024:
+                        f.write(''.join(entries))
+                        entries = []
+                n += 1
+            f.write(''.join(entries))
+            meta['rows'] = n
+            offset = f.tell()
+            f.write(marshal.dumps(meta))
+            f.write(FOOTER.pack(offset))
+            f.close()
+            os.rename(tmp_path, index_path)
+            done = True
+        except Error as exc:
+            raise Exception("Cannot index {}: {}".format(path, exc))
+        finally:
+            if not done:
+                f.close()
+                os.remove(tmp_path)
+
+        return n
+
+    finally:
+        m.close()
+
+@reader_profiled
+@reader_counted
+def range_reader_make(index, path, start, stop=None):
+    """
+    Make a reader of rows :start: up to :stop: of the CSV file at
+    :path:, seeking straight to them by its :Index:, which is closed.
+
+    Returns the same dictionary as :csvu.reader_make:.
+
+    :param start: The first row, from 0.
+    :param stop: The row after the last, default is None for the last.
+    """
+
+    headless = index.meta['headless']
+
+    try:
+        dialect = index.dialect
+        quotechar = quotechar_of(dialect)
+        if stop is None or stop > index.rows:
+            stop = index.rows
+        if start < stop:
+            offset, skip = index.locate(start)
+    finally:
+        index.close()
+
+    m = MappedFile(path)
+
+    def records_g():
+        if start >= stop:
+            return
+        records = m.records(start=offset, quotechar=quotechar, dialect=dialect)
+        if not headless:
+            records = (record for record in records if not isblank(record))
+        for record in islice(records, skip, skip + stop - start):
+            yield record
+
+    return mapped_reader_make(m, dialect, quotechar, headless, lambda: reader(records_g(), dialect=dialect))
+
+@reader_profiled
+@reader_counted
+def tail_reader_make(path, count, dialect='sniff', headless=False, sniff_size=None):
+    """
+    Make a reader of the last :count: rows of the CSV file at :path:.
+
+    If the file has an up to date :Index: then it seeks straight to
+    the rows, otherwise it scans backwards from the end of the file
+    for the records, see :csvu.records.record_tail:. Either way only
+    the last :count: rows are parsed.
+
+    Returns the same dictionary as :csvu.reader_make:, with the rows
+    already parsed. Raises ValueError if the records of the file cannot
+    be found by scanning or are not valid CSV, in which case it should
+    be streamed.
+
+    :param path: The path to a regular, uncompressed CSV file.
+    :param count: The number of rows.
+    :param dialect: The CSV dialect, or 'sniff'.
+    :param headless: Whether or not the CSV file is headless.
+    :param sniff_size: The number of characters to sniff.
+    """
+
+    from csvu import dialect_sniff
+    from csvu.dialect_cache import dialect_cache_get
+
+    index = index_open(path, dialect=dialect, headless=headless)
+
+    if index is not None:
+        try:
+            dialect = index.dialect
+            start = max(0, index.rows - count)
+            if start < index.rows:
+                offset, skip = index.locate(start)
+            else:
+                offset, skip = None, 0
+        finally:
+            index.close()
+    else:
+        offset, skip = None, 0
+        if dialect == 'sniff':
+            cached = dialect_cache_get(path)
+            if cached is not None:
+                dialect = cached[0]
+
+    m = MappedFile(path)
+
+    try:
+        if dialect == 'sniff':
+            dialect = dialect_sniff(m.sample(sniff_size))
+        quotechar = quotechar_of(dialect)
+        if index is None:
+            start = 0
+            if not headless:
+                for s, start in m.spans(quotechar=quotechar, dialect=dialect):
+                    break
+            offset = record_tail(
+                            m.buf,
+                            count,
+                            start=start,
+                            stop=m.size,
+                            quotechar=quotechar,
+                            blank=headless,
+                        )
+            # The boundaries found backwards are checked forwards,
+            # and RecordError is raised if a stray quote put them out.
+            spans = record_spans(m.buf, offset, m.size, quotechar=quotechar, dialect=dialect)
+        elif offset is None:
+            spans = iter([])
+        else:
+            spans = m.spans(start=offset, quotechar=quotechar, dialect=dialect)
+        buf = m.buf
+        records = (buf[s:e] for s, e in spans)
+        if not headless:
+            records = (record for record in records if not isblank(record))
+        # Parsed before anything is written, so that a file which is
+        # not valid CSV can still be streamed instead.
+        rows = list(reader(islice(records, skip, None), dialect=dialect))
+    except Error as exc:
+        m.close()
+        raise ValueError("Cannot read the tail of {}: {}".format(path, exc))
+    except ValueError:
+        m.close()
+        raise
+
+    return mapped_reader_make(m, dialect, quotechar, headless, lambda: rows)
+
+def mapped_reader_make(m, dialect, quotechar, headless, rows_g):
+    """
+    Make a reader of the lists of cells returned by :rows_g: from the
+    :MappedFile: :m:, which is closed when they are exhausted. The
+    fieldnames are parsed from the first record of :m:.
+
+    Returns the same dictionary as :csvu.reader_make:.
+    """
+
+    records = m.records(quotechar=quotechar, dialect=dialect)
+
+    try:
+        record0 = records.next()
+    except StopIteration:
+        record0 = None
+
+    if record0 is None:
+        m.close()
+        if headless:
+            raise StopIteration
+        return {'dialect': dialect, 'fieldnames': None, 'reader': iter([])}
+
+    if headless:
+        fieldnames = [str(i) for i, x in enumerate(cells_parse(record0, dialect))]
+    else:
+        fieldnames = cells_parse(record0, dialect)
+
+    rows = closing_g(rows_g(), m)
+
+    if headless:
+        n = len(fieldnames)
+        rows = (row if len(row) <= n else row[:n] for row in rows)
+
+    return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': row_g_make(rows, fieldnames)}
@@ -0,0 +1,350 @@
+
+import importlib
+from itertools import chain
+import sys
+import traceback
+
+from csvu import (
+        reader_make,
+        writer_make,
+    )
+
+from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
+
+SEPARATOR = '--'
+
+def columns_check(columns, fieldnames):
+    for c in columns:
+        if not c in fieldnames:
+            m = 'Requested column {c} not found, available options are: {fieldnames}'.format(c=c, fieldnames=fieldnames)
+            raise Exception(m)
+
+def stage_column_rename(module, args, row_g, fieldnames, headless):
+    return module.filter_d(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    renames=args.rename,
+                )
+
+def stage_cut(module, args, row_g, fieldnames, headless):
+    if args.columns is None and args.rename is None:
+        raise Exception("need argument --columns or argument --rename or both")
+    return module.filter_d(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    columns=args.columns,
+                    renames=args.rename,
+                    negate=args.negate,
+                )
+
+def stage_grep(module, args, row_g, fieldnames, headless):
+    columns_check([args.column], fieldnames)
+    g = module.filter_g(
+                    row_g=row_g,
+                    col=args.column,
+                    regex=args.regex,
+                    negate=args.negate,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_head(module, args, row_g, fieldnames, headless):
+    g = module.filter_g(
+                    row_g=row_g,
+                    count=args.count,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_levenshtein(module, args, row_g, fieldnames, headless):
+    return module.filter_d(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    column=args.column,
+                    target=args.target,
+                    sort=args.sort,
+                    string=args.string,
+                    debug=args.debug,
+                )
+
+def stage_pretty(module, args, row_g, fieldnames, headless):
+    return {'fieldnames': fieldnames, 'generator': row_g}
+
+def stage_put(module, args, row_g, fieldnames, headless):
+    return module.filter_d(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    puts=args.put,
+                )
+
+def stage_rank(module, args, row_g, fieldnames, headless):
+    return module.filter_d(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    column=args.column,
+                    target=args.target,
+                )
+
+def stage_row_reduce(module, args, row_g, fieldnames, headless):
+    import os
+    sys.path.append(os.getcwd())
+    try:
+        coercions = importlib.import_module(args.coercions)
+    except ImportError:
+        coercions = None
+    try:
+        formats = importlib.import_module(args.formats)
+    except ImportError:
+        formats = None
+    reductions = importlib.import_module(args.reductions)
+    g = module.filter_g(
+                    row_g=row_g,
+                    fieldnames=fieldnames,
+                    coercions=coercions,
+                    reductions=reductions,
+                    formats=formats,
+                    debug=args.debug,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_slice(module, args, row_g, fieldnames, headless):
+    start, stop = args.range
+    g = module.filter_g(
+                    row_g=row_g,
+                    start=start,
+                    stop=stop,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_sort(module, args, row_g, fieldnames, headless):
+    if args.merge or args.check or args.files:
+        raise Exception("sort --merge, --check and --files read files, so are not stages")
+    columns_check(args.columns, fieldnames)
+    ascs = None
+    if args.orders is not None:
+        if len(args.orders) != len(args.columns):
+            raise Exception("sort --orders needs one order for each of --columns")
+        ascs = [o == 'ascending' for o in args.orders]
+    g = module.filter_g(
+                    row_g=row_g,
+                    cols=args.columns,
+                    asc=args.ascending,
+                    numeric=args.numeric,
+                    nastrings=args.nastrings,
+                    buffer_size=args.buffer_size,
+                    temporary_directory=args.temporary_directory,
+                    parallel=args.parallel,
+                    limit=args.limit,
+                    ascs=ascs,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_tail(module, args, row_g, fieldnames, headless):
+    g = module.filter_g(
+                    row_g=row_g,
+                    count=args.count,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_tr(module, args, row_g, fieldnames, headless):
+    if args.columns:
+        columns_check(args.columns, fieldnames)
+    g = module.filter_g(
+                    row_g=row_g,
+                    set0=args.set0,
+                    set1=args.set1,
+                    cols=args.columns,
+                )
+    return {'fieldnames': fieldnames, 'generator': g}
+
+def stage_transpose(module, args, row_g, fieldnames, headless):
+    if headless:
+        return module.filter_d(
+                        row_g=row_g,
+                        fieldnames=fieldnames,
+                    )
+    # csvu-transpose reads and writes headless, so the header is
+    # transposed with the rows and the first row out is the header.
+    header = Row(Schema(fieldnames), list(fieldnames))
+    d = module.filter_d(
+                    row_g=chain([header], row_g),
+                    fieldnames=fieldnames,
+                )
+    g = d['generator']
+    try:
+        fieldnames1 = g.next().cells
+    except StopIteration:
+        fieldnames1 = []
+    schema1 = Schema(fieldnames1)
+    g1 = (Row(schema1, row.cells) for row in g)
+    return {'fieldnames': fieldnames1, 'generator': g1}
+
+STAGES = {
+        'column-rename': ('csvu.column_rename', stage_column_rename),
+        'cut'          : ('csvu.cut', stage_cut),
+        'grep'         : ('csvu.grep', stage_grep),
+        'head'         : ('csvu.head', stage_head),
+        'levenshtein'  : ('csvu.levenshtein', stage_levenshtein),
+        'pretty'       : ('csvu.pretty', stage_pretty),
+        'put'          : ('csvu.put', stage_put),
+        'rank'         : ('csvu.rank', stage_rank),
+        'row-reduce'   : ('csvu.row_reduce', stage_row_reduce),
+        'slice'        : ('csvu.slice', stage_slice),
+        'sort'         : ('csvu.sort', stage_sort),
+        'tail'         : ('csvu.tail', stage_tail),
+        'tr'           : ('csvu.tr', stage_tr),
+        'transpose'    : ('csvu.transpose', stage_transpose),
+    }
+
+def stage_make(argv, headless=False):
+    """
+    Make a pipeline stage from the command line of a tool.
+
+    :param argv: The tool name followed by its arguments, as they would
+        be given to csvu-<tool>, e.g. ['sort', '--columns', 'a'].
+        The input, output and dialect arguments of the tool are ignored.
+    :param headless: Whether the rows of the pipeline have no header.
+
+    :returns: A function of (row_g, fieldnames) which returns a
+        dictionary with 'fieldnames' and 'generator', as does filter_d.
+    """
+
+    if not argv:
+        raise Exception("Empty stage.")
+
+    name = argv[0]
+
+    if not name in STAGES:
+        m = 'Unknown stage {name}, available options are: {names}'.format(name=name, names=sorted(STAGES))
+        raise Exception(m)
+
+    module_name, f = STAGES[name]
+
+    module = importlib.import_module(module_name)
+
+    parser = module.cli_arg_parser()
+    parser.prog = 'csvu-pipe ... {} {}'.format(SEPARATOR, name)
+
+    args = parser.parse_args(argv[1:])
+
+    def stage(row_g, fieldnames):
+        return f(module, args, row_g, fieldnames, headless)
+
+    return stage
+
+def pipe_d(row_g, fieldnames, stages, headless=False):
+    """
+    Chain filters in one process, passing rows directly from each
+    stage to the next rather than writing and reading them as CSV.
+
+    :param row_g: The rows of the input, e.g. reader_make(...)['reader'].
+    :param fieldnames: The column names of the input.
+    :param stages: The stages, in order. Each stage is either a
+        function of (row_g, fieldnames) returning a dictionary with
+        'fieldnames' and 'generator', or a list of command line
+        arguments as taken by :stage_make:.
+    :param headless: Whether the rows have no header.
+
+    :returns: A dictionary with 'fieldnames' and 'generator'.
+    """
+
+    for stage in stages:
+        if not callable(stage):
+            stage = stage_make(stage, headless=headless)
+        d = stage(row_g, fieldnames)
+        row_g      = d['generator']
+        fieldnames = d['fieldnames']
+
+    return {'fieldnames': fieldnames, 'generator': row_g}
+
+def argv_split(argv):
+    """
+    Split :argv: at each SEPARATOR.
+    """
+    parts = [[]]
+    for a in argv:
+        if a == SEPARATOR:
+            parts.append([])
+        else:
+            parts[-1].append(a)
+    return parts[0], parts[1:]
+
+def cli_arg_parser():
+
+    description = '''CSVU pipe runs several CSVU filters in one process,
+                     e.g. csvu-pipe --file0 x.csv -- grep a b
+                     -- sort --columns c -- pretty. Each stage takes the
+                     arguments of its tool, less the input and output ones.'''
+
+    parser = default_arg_parser(
+                    description=description,
+                    file0='input',
+                    file1='output',
+                    dialect0='input',
+                    dialect1='output',
+                    headless=True,
+                )
+
+    return parser
+
+def cli():
+
+    parser = cli_arg_parser()
+
+    argv, stages = argv_split(sys.argv[1:])
+
+    args = parser.parse_args(argv)
+
+    if not stages:
+        parser.error("need at least one stage, e.g. -- head 10")
+
+    try:
+
+        stages1 = [stage_make(s, headless=args.headless) for s in stages]
+
+        reader_d = reader_make(
+                        file_or_path=args.file0,
+                        dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        headless=args.headless,
+                    )
+
+        dialect0    = reader_d['dialect']
+        fieldnames0 = reader_d['fieldnames']
+        reader_g    = reader_d['reader']
+
+        d = pipe_d(
+                        row_g=reader_g,
+                        fieldnames=fieldnames0,
+                        stages=stages1,
+                        headless=args.headless,
+                    )
+
+        g           = d['generator']
+        fieldnames1 = d['fieldnames']
+
+        dialect1 = args.dialect1
+
+        if dialect1 == 'dialect0':
+            dialect1 = dialect0
+
+        if stages[-1][:1] == ['pretty']:
+            dialect1 = 'pretty'
+
+        writer_f = writer_make(
+                        file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
+                        dialect=dialect1,
+                        headless=args.headless,
+                        fieldnames=fieldnames1,
+                    )
+
+        writer_f(g)
+
+    except Exception as exc:
+
+        m = traceback.format_exc()
+        parser.error(m)
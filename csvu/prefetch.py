@@ -0,0 +1,92 @@
+
+import atexit
+from itertools import chain, islice
+from Queue import Empty, Queue
+import sys
+import threading
+
+# The number of lines passed from a reading thread at a time.
+PREFETCH_LINES = 4096
+
+# The number of blocks of lines a reading thread may read ahead.
+PREFETCH_BLOCKS = 64
+
+class Prefetch(object):
+    """
+    Read the lines of a file in a background thread, ahead of their
+    consumer, into a bounded queue.
+
+    Only reading (and decompressing) is done by the thread. The lines
+    are parsed by the consumer, since parsing holds the GIL and two
+    threads parsing at once are slower than one.
+
+    The thread stops once the lines are exhausted, or when the consumer
+    drops or closes its iterator of the lines, e.g. when it stops early.
+
+    :param f: The file, or any iterable of lines.
+    :param lines: The number of lines per block of the queue.
+    :param blocks: The number of blocks the thread may read ahead.
+    """
+
+    def __init__(self, f, lines=PREFETCH_LINES, blocks=PREFETCH_BLOCKS):
+        self.f = f
+        self.lines = lines
+        self.queue = Queue(blocks)
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name='csvu-prefetch')
+        # The consumer may stop early, which must not keep the process alive.
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def run(self):
+        try:
+            f = iter(self.f)
+            while not self.stopped:
+                block = list(islice(f, self.lines))
+                if not block:
+                    break
+                self.queue.put(('lines', block))
+            if not self.stopped:
+                self.queue.put(('end', None))
+        except BaseException:
+            if not self.stopped:
+                self.queue.put(('error', sys.exc_info()))
+
+    def drain(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except Empty:
+            pass
+
+    def stop(self, wait=True):
+        """
+        Stop the thread, e.g. when the consumer has stopped early, so
+        that it is not reading when the interpreter shuts down.
+
+        :param wait: Whether to wait for the thread to end. Otherwise
+            the thread ends after the read it may be blocked in.
+        """
+        self.stopped = True
+        self.drain()
+        while wait and self.thread.is_alive():
+            self.drain()
+            self.thread.join(0.1)
+
+    def blocks_g(self):
+        try:
+            while True:
+                kind, x = self.queue.get()
+                if kind == 'lines':
+                    yield x
+                elif kind == 'end':
+                    return
+                else:
+                    raise x[0], x[1], x[2]
+        finally:
+            # The thread may be blocked on a full queue.
+            self.stop(wait=False)
+
+    def __iter__(self):
+        return chain.from_iterable(self.blocks_g())
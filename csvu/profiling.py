@@ -0,0 +1,163 @@
+
+import atexit
+from functools import wraps
+import sys
+import time
+
+STAGES = ['sniff', 'read', 'filter', 'write', 'other']
+
+PROFILE_TOP = 25
+
+class Profile(object):
+    """
+    Wall clock timers for the stages of a tool, and a cProfile of it.
+
+    Time is charged to one stage at a time, the current one, so the
+    timers of the stages add up to the total. The rows flow lazily
+    from the reader through the filter to the writer, so the stage
+    switches each time a row is passed from one to the next.
+
+    :param path: The file to which to write the pstats, if any.
+    """
+
+    def __init__(self, path=None):
+        import cProfile
+        self.path = path
+        self.times = dict((s, 0.0) for s in STAGES)
+        self.current = 'other'
+        self.t0 = self.mark = time.time()
+        self.profiler = cProfile.Profile()
+
+    def switch(self, stage):
+        """
+        Charge the time since the last switch to the current stage and
+        make :stage: the current stage.
+
+        :returns: The previous stage.
+        """
+        now = time.time()
+        self.times[self.current] += now - self.mark
+        self.mark = now
+        previous, self.current = self.current, stage
+        return previous
+
+    def timed_g(self, stage, g):
+        """
+        Charge the time taken to get each item of :g: to :stage:.
+        """
+        switch = self.switch
+        it = iter(g)
+        while True:
+            previous = switch(stage)
+            try:
+                x = it.next()
+            except StopIteration:
+                switch(previous)
+                return
+            switch(previous)
+            yield x
+
+    def start(self):
+        self.profiler.enable()
+        atexit.register(self.stop)
+
+    def stop(self):
+
+        import pstats
+
+        self.profiler.disable()
+        self.switch(self.current)
+
+        total = time.time() - self.t0
+
+        f = sys.stderr
+
+        f.write('{:<10} {:>10} {:>8}\n'.format('stage', 'seconds', 'percent'))
+        for s in STAGES:
+            t = self.times[s]
+            f.write('{:<10} {:>10.3f} {:>7.1f}%\n'.format(s, t, 100.0 * t / total if total else 0.0))
+        f.write('{:<10} {:>10.3f}\n'.format('total', total))
+
+        if self.path:
+            self.profiler.dump_stats(self.path)
+        else:
+            f.write('\n')
+            stats = pstats.Stats(self.profiler, stream=f)
+            stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+
+_profile = None
+
+def profile_current():
+    """
+    The :Profile: of this process, or None if it is not profiled.
+    """
+    return _profile
+
+def profile_start(path=None):
+    """
+    Profile this process until it exits, when the breakdown by stage
+    is written to STDERR along with, unless :path: is given, the top
+    of the cProfile. If :path: is given, the pstats are written to it.
+    """
+    global _profile
+    if _profile is None:
+        _profile = Profile(path=path)
+        _profile.start()
+    elif path is not None:
+        _profile.path = path
+    return _profile
+
+def profiled(stage):
+    """
+    Decorate a function so that calls to it are charged to :stage:.
+    """
+    def decorator(f):
+        @wraps(f)
+        def g(*args, **kwargs):
+            p = _profile
+            if p is None:
+                return f(*args, **kwargs)
+            previous = p.switch(stage)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                p.switch(previous)
+        return g
+    return decorator
+
+def reader_profiled(f):
+    """
+    Decorate :csvu.reader_make: so that making the reader and reading
+    rows from it are charged to *read*, and what follows to *filter*.
+    """
+    @wraps(f)
+    def g(*args, **kwargs):
+        p = _profile
+        if p is None:
+            return f(*args, **kwargs)
+        p.switch('read')
+        d = f(*args, **kwargs)
+        d['reader'] = p.timed_g('read', d['reader'])
+        p.switch('filter')
+        return d
+    return g
+
+def writer_profiled(f):
+    """
+    Decorate :csvu.writer_make: so that writing is charged to *write*,
+    and getting the rows to write is charged to *filter*.
+    """
+    @wraps(f)
+    def g(*args, **kwargs):
+        wf = f(*args, **kwargs)
+        p = _profile
+        if p is None:
+            return wf
+        def wf1(gen):
+            previous = p.switch('write')
+            try:
+                return wf(p.timed_g('filter', gen))
+            finally:
+                p.switch(previous)
+        return wf1
+    return g
@@ -8,6 +8,7 @@ from csvu import (
         writer_make,
     )
 from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
 
 def cli_arg_parser():
 
@@ -48,9 +49,11 @@ def filter_d(row_g, fieldnames, puts):
 
     puts_d = {c: v for c, v in puts}
 
+    schema1 = Schema(fieldnames1)
+
     def g():
         for row in row_g:
-            yield {fn: puts_d.get(fn, row.get(fn)) for fn in fieldnames1}
+            yield Row(schema1, [puts_d.get(fn, row.get(fn)) for fn in fieldnames1])
 
     return {'fieldnames': fieldnames1, 'generator': g()}
 
@@ -65,6 +68,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                     )
 
         dialect0   = reader_d['dialect']
@@ -87,6 +94,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         fieldnames=fieldnames1,
                     )
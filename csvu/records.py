@@ -0,0 +1,670 @@
+
+from collections import deque
+from cStringIO import StringIO
+from csv import Error, get_dialect, reader, QUOTE_NONE
+from itertools import chain, ifilter
+import mmap
+import os
+
+from csvu.row import (
+        Row,
+        Schema,
+        cells_project_g,
+        projection_make,
+        row_g_make,
+    )
+from csvu.stats import stats_current
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+DIALECT_PARAMS = [
+        'delimiter',
+        'doublequote',
+        'escapechar',
+        'lineterminator',
+        'quotechar',
+        'quoting',
+        'skipinitialspace',
+        'strict',
+    ]
+
+def quotechar_of(dialect):
+    """
+    The quote character to track when scanning for records of
+    :dialect:, or None if the dialect does not quote.
+
+    Raises ValueError if records of :dialect: cannot be found by
+    scanning, i.e. if it uses an escape character.
+    """
+
+    if isinstance(dialect, basestring):
+        dialect = get_dialect(dialect)
+    if dialect.escapechar:
+        raise ValueError("Cannot scan records of a dialect with an escapechar.")
+    if dialect.quoting == QUOTE_NONE:
+        return None
+    return dialect.quotechar
+
+class RecordError(ValueError):
+    """
+    A record found by scanning is not one record to the csv module.
+
+    :param offset: The offset of the record, which is a record boundary.
+    """
+
+    def __init__(self, offset):
+        ValueError.__init__(self, "Not a record at offset {}.".format(offset))
+        self.offset = offset
+
+def record_check(record, dialect):
+    """
+    Whether or not :record: is exactly one record to the csv module.
+
+    A blank line is parsed after :record:, which is a row of its own
+    only if :record: ends outside of quotes.
+    """
+    try:
+        rows = list(reader([record, '\n'], dialect=dialect))
+    except Error:
+        return False
+    return len(rows) == 2 and rows[1] == []
+
+def record_spans(buf, start=0, stop=None, quotechar='"', dialect=None):
+    """
+    Find the records of a CSV buffer.
+
+    A record ends at a newline which is outside of quotes, so quoted
+    fields may contain newlines. Doubled quotes toggle the parity
+    twice and so need no special treatment.
+
+    A quote inside an unquoted field, i.e. one which opens quotes but
+    follows neither a delimiter nor a quote, is kept as is by the csv
+    module and puts the parity out. If :dialect: is given then each
+    record with such a stray quote is checked by :record_check:, and
+    RecordError is raised at the first which fails.
+
+    :param buf: A string or mmap.
+    :param start: The offset of the first record. Must be at a record boundary.
+    :param stop: The offset at which to stop, default is the end of :buf:.
+    :param quotechar: The quote character, or None for no quoting.
+    :param dialect: The CSV dialect, default is None for no checks.
+
+    :returns: A generator of (start, stop) offsets, one per record,
+        each including its line terminator.
+    """
+
+    if stop is None:
+        stop = len(buf)
+
+    find = buf.find
+
+    delimiter = doubled = None
+    if dialect is not None and quotechar:
+        if isinstance(dialect, basestring):
+            dialect = get_dialect(dialect)
+        delimiter = dialect.delimiter
+        if dialect.doublequote:
+            doubled = quotechar
+
+    i = start
+    while i < stop:
+        k = i
+        inside = False
+        stray = False
+        while True:
+            j = find('\n', k, stop)
+            end = stop if j < 0 else j
+            if quotechar:
+                q = find(quotechar, k, end)
+                while q >= 0:
+                    if delimiter and not inside and q > i:
+                        c = buf[q - 1]
+                        if c != delimiter and c != doubled:
+                            stray = True
+                    inside = not inside
+                    q = find(quotechar, q + 1, end)
+            if not inside or j < 0:
+                break
+            k = j + 1
+        e = stop if j < 0 else j + 1
+        if stray and not record_check(buf[i:e], dialect):
+            raise RecordError(i)
+        yield i, e
+        i = e
+
+def record_spans_parsed(buf, start=0, stop=None, dialect='excel'):
+    """
+    Find the records of a CSV buffer by parsing it with the csv module,
+    which is slower than :record_spans: but never wrong.
+
+    Takes the same arguments and returns the same generator as
+    :record_spans:.
+    """
+
+    if stop is None:
+        stop = len(buf)
+
+    find = buf.find
+
+    # The end of the last line read by the parser.
+    end = [start]
+
+    def lines_g():
+        i = start
+        while i < stop:
+            j = find('\n', i, stop)
+            e = stop if j < 0 else j + 1
+            end[0] = e
+            yield buf[i:e]
+            i = e
+
+    i = start
+    for cells in reader(lines_g(), dialect=dialect):
+        yield i, end[0]
+        i = end[0]
+
+def record_align(buf, offset, inside=False, quotechar='"'):
+    """
+    Find the first record boundary at or after :offset:.
+
+    :param buf: A string or mmap.
+    :param offset: The offset to align.
+    :param inside: Whether or not :offset: is inside quotes.
+    :param quotechar: The quote character, or None for no quoting.
+
+    :returns: The offset of the boundary, or len(:buf:) if there is none.
+    """
+
+    if offset == 0 or (not inside and buf[offset - 1] == '\n'):
+        return offset
+
+    find = buf.find
+
+    k = offset
+    while True:
+        j = find('\n', k)
+        if j < 0:
+            return len(buf)
+        if quotechar:
+            q = find(quotechar, k, j)
+            while q >= 0:
+                inside = not inside
+                q = find(quotechar, q + 1, j)
+        if not inside:
+            return j + 1
+        k = j + 1
+
+def record_tail(buf, count, start=0, stop=None, quotechar='"', blank=True):
+    """
+    Find the last :count: records of a CSV buffer by scanning backwards
+    from :stop:, so only those records are read.
+
+    :stop: is the sync point: it is outside of quotes, and a newline is
+    a record boundary iff an even number of quotes lie between it and
+    :stop:. If the scan reaches :start: inside quotes then the quotes
+    do not balance and ValueError is raised.
+
+    :param buf: A string or mmap.
+    :param count: The number of records.
+    :param start: The offset of the first record. Must be at a record boundary.
+    :param stop: The offset of the end of the last record, default is
+        the end of :buf:.
+    :param quotechar: The quote character, or None for no quoting.
+    :param blank: Whether or not blank records are counted.
+
+    :returns: The offset of the first of the last :count: records, or
+        :start: if there are fewer.
+    """
+
+    if stop is None:
+        stop = len(buf)
+
+    rfind = buf.rfind
+    find = buf.find
+
+    n = 0
+    e = stop
+    inside = False
+
+    # The line terminator of the last record is not a boundary.
+    k = stop - 1 if stop > start and buf[stop - 1] == '\n' else stop
+    while k > start:
+        j = rfind('\n', start, k)
+        if quotechar:
+            q = find(quotechar, j + 1 if j >= 0 else start, k)
+            while q >= 0:
+                inside = not inside
+                q = find(quotechar, q + 1, k)
+        if j < 0:
+            break
+        if not inside:
+            # Only a record of at most 2 bytes may be blank.
+            if blank or e - j - 1 > 2 or not isblank(buf[j + 1:e]):
+                n += 1
+                if n == count:
+                    return j + 1
+            e = j + 1
+        k = j
+
+    if inside:
+        raise ValueError("Unbalanced quotes before offset {}.".format(stop))
+
+    return start
+
+class MappedFile(object):
+    """
+    A regular file mapped into memory for reading.
+
+    Records are sliced from the mapping on demand, so the file can be
+    scanned any number of times without being held in the heap.
+
+    :param path: The path to the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'rb')
+        self.size = os.fstat(self.f.fileno()).st_size
+        # The end of the last record read by :records:, see :tell:.
+        self.position = 0
+        if self.size:
+            self.buf = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buf = ''
+
+    def sample(self, size=None):
+        """
+        The first :size: bytes, extended to the end of the line.
+        If :size: is None then the entire file.
+        """
+        if size is None or size >= self.size:
+            return self.buf[:]
+        j = self.buf.find('\n', size)
+        if j < 0:
+            return self.buf[:]
+        return self.buf[:j + 1]
+
+    def spans(self, start=0, stop=None, quotechar='"', dialect=None):
+        """
+        Find the records of the file, as by :record_spans:. If :dialect:
+        is given then the records from the first which is not one
+        record to the csv module are found by :record_spans_parsed:.
+        """
+        buf = self.buf
+        try:
+            for span in record_spans(buf, start=start, stop=stop, quotechar=quotechar, dialect=dialect):
+                yield span
+        except RecordError as exc:
+            for span in record_spans_parsed(buf, start=exc.offset, stop=stop, dialect=dialect):
+                yield span
+
+    def records(self, start=0, stop=None, quotechar='"', dialect=None):
+        buf = self.buf
+        try:
+            for s, e in record_spans(buf, start=start, stop=stop, quotechar=quotechar, dialect=dialect):
+                self.position = e
+                yield buf[s:e]
+        except RecordError as exc:
+            for s, e in record_spans_parsed(buf, start=exc.offset, stop=stop, dialect=dialect):
+                self.position = e
+                yield buf[s:e]
+
+    def fileno(self):
+        return self.f.fileno()
+
+    def tell(self):
+        """
+        The offset up to which the file has been read, as a file's
+        position, so that --stats can measure it.
+        """
+        return self.position
+
+    def close(self):
+        if self.size:
+            self.buf.close()
+        self.f.close()
+
+def isblank(record):
+    return record == '\n' or record == '\r\n'
+
+def cells_parse(record, dialect):
+    for cells in reader([record], dialect=dialect):
+        return cells
+    return []
+
+_cells = Row.cells
+
+class RecordRow(Row):
+    """
+    A :Row: which keeps its raw record and parses it into cells
+    only when a cell is first used.
+
+    The :schema: must carry the dialect of the record.
+
+    :param schema: The :Schema: of the row.
+    :param record: The raw record, including its line terminator.
+    """
+
+    __slots__ = ('record',)
+
+    truncate = False
+
+    def __init__(self, schema, record):
+        self.schema = schema
+        self.extras = None
+        self.record = record
+
+    def _cells_get(self):
+        try:
+            return _cells.__get__(self, RecordRow)
+        except AttributeError:
+            pass
+        cells = cells_parse(self.record, self.schema.dialect)
+        n = len(self.schema)
+        m = len(cells)
+        if m < n:
+            cells.extend(None for i in xrange(n - m))
+        elif m > n:
+            if not self.truncate:
+                self.extras = {None: cells[n:]}
+            del cells[n:]
+        _cells.__set__(self, cells)
+        return cells
+
+    def _cells_set(self, cells):
+        _cells.__set__(self, cells)
+
+    cells = property(_cells_get, _cells_set)
+
+class HeadlessRecordRow(RecordRow):
+    """
+    A :RecordRow: of a headless CSV file, surplus cells are dropped.
+    """
+
+    __slots__ = ()
+
+    truncate = True
+
+def closing_g(g, f):
+    """
+    Yield from :g: and close :f: when it is exhausted.
+    """
+    try:
+        for x in g:
+            yield x
+    finally:
+        f.close()
+
+def mmap_reader_make(path, dialect='sniff', headless=False, sniff_size=None, columns=None):
+    """
+    Make a reader for a regular CSV file by mapping it into memory.
+
+    Takes the same arguments and returns the same dictionary as
+    :csvu.reader_make:. Record boundaries are found in the mapped
+    file and each row is parsed only when one of its cells is used,
+    unless :columns: are given, in which case rows are parsed as they
+    are read and only :columns: are kept. The file is unmapped when
+    the rows are exhausted.
+    """
+
+    from csvu import dialect_sniff
+
+    m = MappedFile(path)
+
+    if dialect == 'sniff':
+        dialect = dialect_sniff(m.sample(sniff_size))
+
+    try:
+        quotechar = quotechar_of(dialect)
+    except ValueError:
+        m.close()
+        raise
+
+    stats = stats_current()
+    if stats is not None:
+        stats.input_add(m)
+
+    records = m.records(quotechar=quotechar, dialect=dialect)
+
+    try:
+        record0 = records.next()
+    except StopIteration:
+        record0 = None
+
+    if columns is not None:
+        if headless:
+            if record0 is None:
+                m.close()
+                raise StopIteration
+            records = chain([record0], records)
+            fieldnames = [str(i) for i, x in enumerate(cells_parse(record0, dialect))]
+            rows = reader(records, dialect=dialect)
+        else:
+            fieldnames = None if record0 is None else cells_parse(record0, dialect)
+            rows = ifilter(None, reader(records, dialect=dialect))
+        try:
+            fieldnames, indexes = projection_make(fieldnames, columns)
+        except Exception:
+            m.close()
+            raise
+        rows = closing_g(cells_project_g(rows, indexes), m)
+        return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': row_g_make(rows, fieldnames)}
+
+    if headless:
+        if record0 is None:
+            m.close()
+            raise StopIteration
+        fieldnames = [str(i) for i, x in enumerate(cells_parse(record0, dialect))]
+        schema = Schema(fieldnames, dialect=dialect)
+        def gen():
+            try:
+                yield HeadlessRecordRow(schema, record0)
+                for record in records:
+                    yield HeadlessRecordRow(schema, record)
+            finally:
+                m.close()
+    else:
+        fieldnames = None if record0 is None else cells_parse(record0, dialect)
+        schema = Schema(fieldnames or [], dialect=dialect)
+        def gen():
+            try:
+                for record in records:
+                    if not isblank(record):
+                        yield RecordRow(schema, record)
+            finally:
+                m.close()
+
+    return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': gen()}
+
+def dialect_params(dialect):
+    """
+    The format parameters of :dialect:, which unlike sniffed dialects
+    may be sent to another process.
+    """
+    if isinstance(dialect, basestring):
+        dialect = get_dialect(dialect)
+    return {k: getattr(dialect, k) for k in DIALECT_PARAMS if hasattr(dialect, k)}
+
+def _quotes_count(args):
+    path, start, stop, quotechar = args
+    m = MappedFile(path)
+    try:
+        return m.buf[start:stop].count(quotechar)
+    finally:
+        m.close()
+
+def _chunk_parse(args):
+    path, start, stop, params, headless, indexes = args
+    from csvu.cache import dialect_of_params
+    dialect = dialect_of_params(params)
+    m = MappedFile(path)
+    try:
+        try:
+            for span in record_spans(m.buf, start, stop, quotechar=quotechar_of(dialect), dialect=dialect):
+                pass
+        except RecordError:
+            return None
+        rows = reader(StringIO(m.buf[start:stop]), **params)
+        if not headless:
+            rows = ifilter(None, rows)
+        if indexes is not None:
+            rows = cells_project_g(rows, indexes)
+        return list(rows)
+    finally:
+        m.close()
+
+def chunk_bounds(m, start, quotechar, pool, chunk_size=CHUNK_SIZE):
+    """
+    Split a :MappedFile: from :start: into chunks of about :chunk_size:
+    bytes, each beginning and ending at a record boundary.
+
+    The quotes of each chunk are counted in :pool:, so that whether
+    or not each split is inside quotes is known exactly.
+
+    :returns: A list of (start, stop) offsets.
+    """
+
+    splits = range(start, m.size, chunk_size) + [m.size]
+
+    if quotechar:
+        counts = pool.map(
+                        _quotes_count,
+                        [(m.path, s, e, quotechar) for s, e in zip(splits, splits[1:])],
+                    )
+    else:
+        counts = [0] * (len(splits) - 1)
+
+    bounds = [start]
+    parity = 0
+    for s, count in zip(splits[1:-1], counts):
+        parity ^= count & 1
+        b = record_align(m.buf, s, inside=bool(parity), quotechar=quotechar)
+        if b > bounds[-1]:
+            bounds.append(b)
+    if bounds[-1] < m.size:
+        bounds.append(m.size)
+
+    return zip(bounds, bounds[1:])
+
+def chunk_rows_g(m, start, dialect, jobs, chunk_size=CHUNK_SIZE, headless=False, indexes=None):
+    """
+    Parse a :MappedFile: from :start: with a pool of :jobs: processes.
+
+    The chunks are parsed out of order but their rows are yielded in
+    order, and at most 2 * :jobs: chunks are in flight at any time.
+    Unless :headless:, blank rows are dropped. If :indexes: are given
+    then only the cells at :indexes: are kept, before the rows are
+    sent back from the pool.
+
+    Each process checks the records of its chunk, see :record_spans:.
+    From the first chunk whose records fail, the rest of the file is
+    parsed in this process, as by :MappedFile.records:.
+
+    :returns: A generator of lists of cells.
+    """
+
+    quotechar = quotechar_of(dialect)
+    params = dialect_params(dialect)
+
+    # Imported here, since it is slow to import and only --jobs needs it.
+    import multiprocessing
+
+    pool = multiprocessing.Pool(jobs)
+
+    try:
+        bounds = iter(chunk_bounds(m, start, quotechar, pool, chunk_size=chunk_size))
+        pending = deque()
+        def results_g():
+            for s, e in bounds:
+                pending.append((s, e, pool.apply_async(_chunk_parse, ((m.path, s, e, params, headless, indexes),))))
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        for s, e, result in results_g():
+            rows = result.get()
+            if rows is None:
+                # The records of the chunk fail their check, so the
+                # parity of the splits is out from here on and the
+                # rest of the file is parsed in order.
+                pool.terminate()
+                rows = reader(m.records(start=s, quotechar=quotechar, dialect=dialect), dialect=dialect)
+                if not headless:
+                    rows = ifilter(None, rows)
+                if indexes is not None:
+                    rows = cells_project_g(rows, indexes)
+                for row in rows:
+                    yield row
+                return
+            m.position = e
+            for row in rows:
+                yield row
+    finally:
+        pool.terminate()
+        m.close()
+
+def parallel_reader_make(path, dialect='sniff', headless=False, sniff_size=None, jobs=2, chunk_size=CHUNK_SIZE, columns=None):
+    """
+    Make a reader for a regular CSV file which parses it in parallel.
+
+    Takes the same arguments and returns the same dictionary as
+    :csvu.reader_make:. The file is split into chunks at record
+    boundaries and the chunks are parsed by a pool of :jobs: processes.
+    """
+
+    from csvu import dialect_sniff
+
+    m = MappedFile(path)
+
+    if dialect == 'sniff':
+        dialect = dialect_sniff(m.sample(sniff_size))
+
+    try:
+        quotechar = quotechar_of(dialect)
+    except ValueError:
+        m.close()
+        raise
+
+    stats = stats_current()
+    if stats is not None:
+        stats.input_add(m)
+
+    spans = m.spans(quotechar=quotechar, dialect=dialect)
+
+    try:
+        s, e = spans.next()
+    except StopIteration:
+        s, e = 0, 0
+
+    row0 = cells_parse(m.buf[s:e], dialect) if e else None
+
+    if headless:
+        if row0 is None:
+            m.close()
+            raise StopIteration
+        fieldnames = [str(i) for i, x in enumerate(row0)]
+    else:
+        fieldnames = row0
+
+    indexes = None
+    if columns is not None:
+        try:
+            fieldnames1, indexes = projection_make(fieldnames, columns)
+        except Exception:
+            m.close()
+            raise
+
+    rows = chunk_rows_g(m, e, dialect, jobs, chunk_size=chunk_size, headless=headless, indexes=indexes)
+
+    if headless:
+        if indexes is None:
+            n = len(fieldnames)
+            rows = (row if len(row) <= n else row[:n] for row in rows)
+        else:
+            row0 = [row0[i] if i < len(row0) else None for i in indexes]
+        rows = chain([row0], rows)
+
+    if indexes is not None:
+        fieldnames = fieldnames1
+
+    return {'dialect': dialect, 'fieldnames': fieldnames, 'reader': row_g_make(rows, fieldnames)}
@@ -0,0 +1,209 @@
+
+from itertools import izip
+
+class Schema(object):
+    """
+    The column names of a stream of rows, shared by every row in it.
+
+    :param fieldnames: The column names, in order.
+    :param dialect: The CSV dialect of the stream, if known.
+    """
+
+    __slots__ = ('fieldnames', 'index', 'dialect')
+
+    def __init__(self, fieldnames, dialect=None):
+        self.fieldnames = list(fieldnames)
+        self.index = {fn: i for i, fn in enumerate(self.fieldnames)}
+        self.dialect = dialect
+
+    def __len__(self):
+        return len(self.fieldnames)
+
+    def __repr__(self):
+        return 'Schema({!r})'.format(self.fieldnames)
+
+class Row(object):
+    """
+    A row of a CSV file which behaves like a dictionary.
+
+    The cells are kept in a list in the order of the schema, and
+    the schema is shared by every row of a stream, so a row costs
+    one small object plus one list. Keys which are not in the schema
+    may still be assigned, they are kept in a dictionary of extras.
+
+    :param schema: The :Schema: of the row.
+    :param cells: The values of the row, in the order of :schema:.
+    """
+
+    __slots__ = ('schema', 'cells', 'extras')
+
+    def __init__(self, schema, cells, extras=None):
+        self.schema = schema
+        self.cells  = cells
+        self.extras = extras
+
+    def __getitem__(self, key):
+        i = self.schema.index.get(key)
+        if i is not None:
+            return self.cells[i]
+        if self.extras is not None:
+            return self.extras[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        i = self.schema.index.get(key)
+        if i is not None:
+            self.cells[i] = value
+        elif self.extras is None:
+            self.extras = {key: value}
+        else:
+            self.extras[key] = value
+
+    def __contains__(self, key):
+        if key in self.schema.index:
+            return True
+        return self.extras is not None and key in self.extras
+
+    has_key = __contains__
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def __len__(self):
+        n = len(self.cells)
+        if self.extras is not None:
+            n += len(self.extras)
+        return n
+
+    def __eq__(self, other):
+        try:
+            return dict(self.iteritems()) == dict(other.iteritems())
+        except AttributeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+
+    def __repr__(self):
+        return 'Row({!r})'.format(dict(self.iteritems()))
+
+    def __getstate__(self):
+        return (self.schema.fieldnames, list(self.cells), self.extras)
+
+    def __setstate__(self, state):
+        fieldnames, self.cells, self.extras = state
+        self.schema = Schema(fieldnames)
+
+    def get(self, key, default=None):
+        i = self.schema.index.get(key)
+        if i is not None:
+            return self.cells[i]
+        if self.extras is not None:
+            return self.extras.get(key, default)
+        return default
+
+    def iterkeys(self):
+        for fn in self.schema.fieldnames[:len(self.cells)]:
+            yield fn
+        if self.extras is not None:
+            for k in self.extras:
+                yield k
+
+    def itervalues(self):
+        for v in self.cells:
+            yield v
+        if self.extras is not None:
+            for v in self.extras.itervalues():
+                yield v
+
+    def iteritems(self):
+        for kv in izip(self.schema.fieldnames, self.cells):
+            yield kv
+        if self.extras is not None:
+            for kv in self.extras.iteritems():
+                yield kv
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+    def update(self, other=(), **kwargs):
+        if hasattr(other, 'iteritems'):
+            other = other.iteritems()
+        for k, v in other:
+            self[k] = v
+        for k, v in kwargs.iteritems():
+            self[k] = v
+
+    def copy(self):
+        extras = self.extras
+        if extras is not None:
+            extras = dict(extras)
+        return Row(self.schema, list(self.cells), extras)
+
+def row_g_make(rows, fieldnames, restkey=None, restval=None):
+    """
+    Make :Row: objects from lists of cells, sharing one :Schema:.
+
+    Short rows are padded with :restval: and the surplus cells of
+    long rows are kept as a list under :restkey:, as does DictReader.
+
+    :param rows: An iterable of lists of cells.
+    :param fieldnames: The column names.
+    """
+
+    schema = Schema(fieldnames or [])
+    n = len(schema)
+
+    for cells in rows:
+        m = len(cells)
+        if m == n:
+            yield Row(schema, cells)
+        elif m < n:
+            cells.extend(restval for i in xrange(n - m))
+            yield Row(schema, cells)
+        else:
+            yield Row(schema, cells[:n], {restkey: cells[n:]})
+
+def projection_make(fieldnames, columns):
+    """
+    Find the columns to keep of rows with :fieldnames:.
+
+    :param fieldnames: The column names of the rows.
+    :param columns: The column names to keep, in order.
+
+    :returns: A tuple (fieldnames1, indexes) of the names and
+        positions of the columns to keep, without duplicates.
+    """
+
+    index = {fn: i for i, fn in enumerate(fieldnames or [])}
+
+    fieldnames1 = []
+    for c in columns:
+        if c not in index:
+            raise Exception("Column not found: {}".format(c))
+        if c not in fieldnames1:
+            fieldnames1.append(c)
+
+    return fieldnames1, [index[c] for c in fieldnames1]
+
+def cells_project_g(rows, indexes):
+    """
+    Keep only the cells at :indexes: of each list of cells in :rows:.
+    Missing cells are None.
+    """
+
+    m = max(indexes) + 1 if indexes else 0
+
+    for cells in rows:
+        if len(cells) < m:
+            cells = cells + [None] * (m - len(cells))
+        yield [cells[i] for i in indexes]
@@ -0,0 +1,121 @@
+
+from itertools import islice
+
+import os
+import traceback
+
+from csvu import (
+        reader_make,
+        writer_make,
+    )
+from csvu.cli import (
+        default_arg_parser,
+        row_range,
+    )
+from csvu.offsets import (
+        index_open,
+        range_reader_make,
+    )
+
+def cli_arg_parser():
+
+    description = '''CSVU Slice returns a range of rows of a CSV file.
+                     If the file has an up to date index, see
+                     csvu-index, then it seeks straight to the rows,
+                     otherwise it reads up to them.'''
+
+    parser = default_arg_parser(
+                    description=description,
+                    file0='input',
+                    file1='output',
+                    dialect0='input',
+                    dialect1='output',
+                    headless=True,
+                )
+
+    parser.add_argument(
+            'range',
+            type=row_range,
+            help='''Return rows START up to but not including STOP,
+                    counting from 0, given as START:STOP. Either may
+                    be omitted, and N alone is the row N.'''
+        )
+
+    return parser
+
+def filter_g(row_g, start, stop=None, debug=False):
+    for row in islice(row_g, start, stop):
+        yield row
+
+def cli():
+
+    parser = cli_arg_parser()
+
+    args = parser.parse_args()
+
+    try:
+
+        start, stop = args.range
+
+        index = None
+
+        if args.file0 != '-' and os.path.isfile(args.file0):
+            index = index_open(
+                            args.file0,
+                            dialect=args.dialect0,
+                            headless=args.headless,
+                        )
+
+        if index is not None:
+
+            reader_d = range_reader_make(
+                            index,
+                            args.file0,
+                            start=start,
+                            stop=stop,
+                        )
+
+            g = reader_d['reader']
+
+        else:
+
+            reader_d = reader_make(
+                            file_or_path=args.file0,
+                            dialect=args.dialect0,
+                            sniff_size=args.sniff_size,
+                            mmap=args.mmap,
+                            jobs=args.jobs,
+                            cache=args.cache,
+                            headless=args.headless,
+                        )
+
+            g = filter_g(
+                            row_g=reader_d['reader'],
+                            start=start,
+                            stop=stop,
+                        )
+
+        dialect0   = reader_d['dialect']
+        fieldnames = reader_d['fieldnames']
+
+        dialect1 = args.dialect1
+
+        if dialect1 == 'dialect0':
+            dialect1 = dialect0
+
+        writer_f = writer_make(
+                        file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
+                        dialect=dialect1,
+                        headless=args.headless,
+                        fieldnames=fieldnames,
+                    )
+
+        writer_f(g)
+
+    except Exception as exc:
+
+        m = traceback.format_exc()
+        parser.error(m)
+
@@ -1,10 +1,12 @@
 
-from csv import Sniffer
-import sys
+from cStringIO import StringIO
+from csv import Sniffer, reader
+import os
 import traceback
-from prettytable import PrettyTable
 
 from csvu import DELIMITERS
+from csvu.compress import reader_file_make
+from csvu.dialect_cache import dialect_cache_put
 from csvu.cli import (
         default_arg_parser,
         positive_int,
@@ -12,7 +14,10 @@ from csvu.cli import (
 
 def cli_arg_parser():
 
-    description = 'CSVU sniff will determine the dialect of a CSV file.'
+    description = '''CSVU sniff will determine the dialect of a CSV file.
+                     The dialect of a file is kept in the dialect cache,
+                     where other tools find it instead of sniffing, until
+                     the file changes.'''
     parser = default_arg_parser(
                     description=description,
                     file0='input',
@@ -35,16 +40,20 @@ def cli():
 
     try:
 
-        f = sys.stdin
-
-        if args.file0 != '-':
-            f = open(args.file0, 'r')
+        f, compression = reader_file_make(args.file0)
 
         sample = f.read(args.N)
 
         dialect = Sniffer().sniff(sample, delimiters=DELIMITERS)
 
-        v = vars(dialect)
+        if args.file0 != '-' and os.path.isfile(args.file0):
+            try:
+                fieldnames = reader(StringIO(sample), dialect=dialect).next()
+            except StopIteration:
+                fieldnames = None
+            dialect_cache_put(args.file0, dialect, fieldnames)
+
+        from prettytable import PrettyTable
 
         x = PrettyTable(header=False)
         for k, v in vars(dialect).iteritems():
@@ -1,14 +1,55 @@
 
+from array import array
+from csv import Error
+from heapq import merge, nlargest, nsmallest
+from itertools import chain, islice, izip
+import marshal
 from operator import itemgetter
+import os
+import shutil
+import sys
+import tempfile
 import traceback
 
 from csvu import (
         reader_make,
+        writer_file_done,
+        writer_file_make,
         writer_make,
     )
-from csvu.cli import default_arg_parser
+from csvu.cli import (
+        byte_size,
+        default_arg_parser,
+        positive_int,
+    )
+from csvu.compress import compression_of_file
+from csvu.records import (
+        MappedFile,
+        cells_parse,
+        isblank,
+        quotechar_of,
+    )
+from csvu.row import Row
 from csvu.util import K_NASTRINGs
 
+# The estimated bytes of memory per row and per cell, besides the
+# characters of the cells, when sorting with a buffer size.
+ROW_OVERHEAD = 128
+CELL_OVERHEAD = 48
+
+# The most rows per block of a run file. Blocks are smaller when
+# runs are, so that a block of each run merged fits in the buffer.
+RUN_BLOCK_ROWS = 4096
+
+# The most runs merged at once, so as not to run out of file handles.
+MERGE_FANIN = 64
+
+# The fewest rows worth sorting with --parallel.
+PARALLEL_ROWS = 16 * 1024
+
+# The fewest rows worth sorting with numpy, which is slow to import.
+NUMPY_ROWS = 16 * 1024
+
 def cli_arg_parser():
 
     description = 'CSVU Sort is like GNU Sort, but for CSV files.'
@@ -36,7 +77,9 @@ def cli_arg_parser():
     parser.add_argument(
             '--numeric', 
             action='store_true', 
-            help='Attempt to convert each field to *float* prior to sort.'
+            help='''Attempt to convert each field to *float* prior to sort.
+                    If numpy is installed then large inputs are sorted
+                    by column with numpy.lexsort, in the same order.'''
         )
 
     parser.add_argument(
@@ -46,6 +89,17 @@ def cli_arg_parser():
             help='Values which get converted to *None* prior to sorting.'
         )
 
+    parser.add_argument(
+            '--orders',
+            type=str,
+            nargs='+',
+            choices=['ascending', 'descending'],
+            default=None,
+            help='''The order of each of --columns, in the same pass,
+                    e.g. --columns a b --orders descending ascending.
+                    Overrides --ascending and --descending.'''
+        )
+
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
             '--ascending', 
@@ -58,51 +112,862 @@ def cli_arg_parser():
             help='Sort rows in descending order.'
         )
 
+    parser.add_argument(
+            '--buffer-size',
+            metavar='SIZE',
+            type=byte_size,
+            default=None,
+            help='''Sort at most about SIZE bytes of rows in memory
+                    at a time, e.g. 512M. Sorted runs of rows are
+                    written to temporary files and then merged.
+                    Default is to sort every row in memory.'''
+        )
+
+    parser.add_argument(
+            '--temporary-directory',
+            metavar='DIR',
+            type=str,
+            default=None,
+            help='''The directory in which to write the runs of
+                    --buffer-size. Default is $TMPDIR, else /tmp.'''
+        )
+
+    parser.add_argument(
+            '--parallel',
+            metavar='N',
+            type=positive_int,
+            default=1,
+            help='''The number of processes with which to make the
+                    keys of rows and sort them. The rows are split
+                    into N chunks which are sorted in parallel and
+                    then merged. With --buffer-size, each run is
+                    sorted so.'''
+        )
+
+    parser.add_argument(
+            '--limit',
+            metavar='K',
+            type=positive_int,
+            default=None,
+            help='''Return only the first K rows of the sort, as
+                    would csvu-head K after it, keeping only K rows
+                    in memory. Ignores --buffer-size and --parallel,
+                    which are not needed then.'''
+        )
+
+    parser.add_argument(
+            '--offsets',
+            action='store_true',
+            help='''Sort a regular FILE0 by reading only the keys and
+                    byte offsets of its records, then copy the records
+                    from FILE0 to the output in order, verbatim. Only
+                    the keys are held in memory. The output dialect
+                    is that of FILE0.'''
+        )
+
+    parser.add_argument(
+            '--files',
+            metavar='FILE',
+            type=str,
+            nargs='+',
+            default=None,
+            help='''Input CSV files for --merge or --check, instead
+                    of FILE0.'''
+        )
+
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+            '--merge',
+            action='store_true',
+            help='''Merge inputs which are each sorted already,
+                    keeping one row of each in memory. Rows with
+                    equal keys are taken from the inputs in order.
+                    An input which is not sorted is an error.'''
+        )
+    group.add_argument(
+            '--check',
+            action='store_true',
+            help='''Check that each input is sorted, rather than
+                    sort it. The first row out of order, counting
+                    from 0 as does csvu-slice, is reported to STDERR
+                    and the exit status is 1.'''
+        )
+
     return parser
 
-def filter_g(row_g, cols, asc=True, numeric=False, nastrings=K_NASTRINGs):
+def caster_make(numeric=False, nastrings=K_NASTRINGs):
     """
-    :param row_g: Rows to sort. :row_g: must be a generator of dictionaries.
+    Make the sort key of one cell.
+
+    :param numeric: Interpret keys as numeric. :numeric: must be bool.
+    :param nastrings: Values to compare as equivalent to None in python term order.
+    """
+
+    def caster(y):
+        y = y.strip().upper()
+        if y in nastrings:
+            return None
+        if numeric:
+            try:
+                z = float(y)
+                return z
+            except:
+                pass
+        return y
+
+    return caster
+
+def key_make(cols, numeric=False, nastrings=K_NASTRINGs, ascs=None):
+    """
+    Make the sort key of rows.
+
     :param cols: Columns for keys. :cols: must be a generator of strings.
-    :param asc: Ascending or descending. :asc: must be bool.
-    :param numeric: Interpret keys as numeric. :asc: must be bool.
+    :param numeric: Interpret keys as numeric. :numeric: must be bool.
     :param nastrings: Values to compare as equivalent to None in python term order.
+    :param ascs: Ascending or descending, per column of :cols:, default None.
+        If given, the keys of descending columns compare in reverse,
+        so the key is to be sorted ascending.
     """
 
-    def mkkey():
+    caster = caster_make(numeric=numeric, nastrings=nastrings)
 
-        def caster(y):
-            y = y.strip().upper()
-            if y in nastrings:
-                return None
-            if numeric:
+    ig = itemgetter(*cols)
+
+    if ascs is not None:
+        casters = [caster if asc else (lambda y: Descending(caster(y))) for asc in ascs]
+        def key_orders(x):
+            y = ig(x)
+            if len(cols) == 1:
+                y = (y,)
+            return tuple(c(i) for c, i in izip(casters, y))
+        return key_orders
+
+    def key_len_1(x):
+        y = ig(x)
+        return caster(y)
+
+    def key_len_N(x):
+        y = ig(x)
+        return tuple(caster(i) for i in y)
+
+    if len(cols) == 1:
+        return key_len_1
+    else:
+        return key_len_N
+
+class Descending(object):
+    """
+    A sort key which compares in reverse.
+    """
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return self.key != other.key
+
+    def __repr__(self):
+        return 'Descending({!r})'.format(self.key)
+
+    def __getstate__(self):
+        return (self.key,)
+
+    def __setstate__(self, state):
+        self.key, = state
+
+def key_plain(k):
+    """
+    The key :k: of columns in both orders, as made by :key_make:,
+    without its :Descending: wrappers, so that it can be marshaled.
+    """
+    return tuple(x.key if isinstance(x, Descending) else x for x in k)
+
+def key_orders(k, ascs):
+    """
+    Wrap the descending columns of the plain key :k: again, see :key_plain:.
+    """
+    return tuple(x if a else Descending(x) for x, a in izip(k, ascs))
+
+def numpy_import():
+    """
+    Import numpy, or return None if it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def column_keys_make(np, cells, numeric=False, nastrings=K_NASTRINGs):
+    """
+    Encode the keys made by :caster_make: of a column as arrays which
+    sort as the keys do in python: None, then numbers, then strings.
+
+    :returns: A list of arrays, most significant first, or None if the
+        keys cannot be encoded, i.e. if a number is NaN.
+    """
+
+    n = len(cells)
+
+    s = np.char.upper(np.char.strip(np.array(cells, dtype=str)))
+
+    na = np.in1d(s, list(nastrings))
+
+    # 0 for None, 1 for numbers, 2 for strings.
+    classes = np.where(na, 0, 2).astype(np.int8)
+
+    values = np.zeros(n, dtype=np.float64)
+
+    if numeric:
+        try:
+            values = np.where(na, '0', s).astype(np.float64)
+            isnum = ~na
+        except ValueError:
+            isnum = np.zeros(n, dtype=bool)
+            for j in np.flatnonzero(~na):
                 try:
-                    z = float(y)
-                    return z
-                except:
+                    values[j] = float(s[j])
+                    isnum[j] = True
+                except ValueError:
                     pass
-            return y
+        if np.isnan(values[isnum]).any():
+            return None
+        values[~isnum] = 0.0
+        classes[isnum] = 1
 
-        ig = itemgetter(*cols)
+    ranks = np.zeros(n, dtype=np.int64)
 
-        def key_len_1(x):
-            y = ig(x)
-            return caster(y)
+    strs = classes == 2
+    if strs.any():
+        u, ranks[strs] = np.unique(s[strs], return_inverse=True)
 
-        def key_len_N(x):
-            y = ig(x)
-            return tuple(caster(i) for i in y)
+    return [classes, values, ranks]
 
-        if len(cols) == 1:
-            return key_len_1
+def vector_order(rows, cols, ascs, numeric=False, nastrings=K_NASTRINGs):
+    """
+    Sort :rows: by column with numpy.lexsort. The order is the same as
+    that of a stable sort with :key_make:.
+
+    The columns are read as a column batch (see csvu.batch). With
+    :numeric:, the columns of the batch which are all NA or numbers
+    are keyed by its arrays directly, the others by :column_keys_make:.
+
+    :param ascs: Ascending or descending, per column of :cols:.
+
+    :returns: The indexes of :rows: in order, or None if numpy is not
+        installed or the keys cannot be encoded.
+    """
+
+    np = numpy_import()
+    if np is None or not rows:
+        return None
+
+    from csvu.batch import batch_make
+
+    # key_make compares the stripped, upper-cased cell with :nastrings:
+    # as given, so a string which is not stripped and upper-cased
+    # never matches. The batch would match it.
+    nastrings = [x for x in nastrings if x == x.strip().upper()]
+
+    batch = batch_make(rows, cols, numeric=(None if numeric else []), nastrings=nastrings)
+
+    keys = []
+    for c, asc in zip(cols, ascs):
+        values = batch[c]
+        mask = batch.mask(c)
+        if mask is None:
+            cells = batch.strings[batch.index[c]]
+            arrays = column_keys_make(np, cells, numeric=numeric, nastrings=nastrings)
+            if arrays is None:
+                return None
         else:
-            return key_len_N
+            if np.isnan(values[~mask]).any():
+                return None
+            # 0 for None, 1 for numbers, as in column_keys_make.
+            arrays = [np.where(mask, 0, 1).astype(np.int8), np.where(mask, 0.0, values)]
+        if not asc:
+            # Reversing each key keeps equal rows in order, as does
+            # sorted(..., reverse=True).
+            arrays = [-a for a in arrays]
+        keys.extend(arrays)
+
+    # The last key of lexsort is the most significant.
+    return np.lexsort(keys[::-1])
 
-    key = mkkey()
+def _chunk_sort(args):
+    values, start, single, numeric, nastrings, asc, ascs = args
+    caster = caster_make(numeric=numeric, nastrings=nastrings)
+    if ascs is not None:
+        if single:
+            values = [(y,) for y in values]
+        keys = [tuple(caster(x) if a else Descending(caster(x)) for x, a in izip(y, ascs)) for y in values]
+    elif single:
+        keys = map(caster, values)
+    else:
+        keys = [tuple(caster(x) for x in y) for y in values]
+    return sorted(izip(keys, xrange(start, start + len(values))), key=itemgetter(0), reverse=(not asc))
+
+def keys_sort(rows, cols, key, asc=True, numeric=False, nastrings=K_NASTRINGs, pool=None, jobs=1, ascs=None):
+    """
+    Sort the keys of :rows:.
+
+    If a :pool: of :jobs: processes is given then the rows are split
+    into :jobs: chunks, the keys of which are made and sorted in the
+    pool, and the sorted chunks are merged. Only the cells of :cols:
+    are sent to the pool. The :key: and :ascs: are as by :key_make:.
+
+    :returns: A list of (key, i) in order, where i indexes :rows:.
+    """
+
+    n = len(rows)
+
+    if pool is None or n < PARALLEL_ROWS:
+        keys = map(key, rows)
+        return sorted(izip(keys, xrange(n)), key=itemgetter(0), reverse=(not asc))
+
+    row0 = rows[0]
+    if isinstance(row0, Row) and all(isinstance(row, Row) and row.schema is row0.schema for row in rows):
+        ig = itemgetter(*[row0.schema.index[c] for c in cols])
+        values = [ig(row.cells) for row in rows]
+    else:
+        values = map(itemgetter(*cols), rows)
+
+    size = -(-n // jobs)
+
+    tasks = [(values[s:s + size], s, len(cols) == 1, numeric, nastrings, asc, ascs) for s in xrange(0, n, size)]
+
+    pairs = []
+    for chunk in pool.imap(_chunk_sort, tasks):
+        pairs.extend(chunk)
+
+    # The chunks are sorted runs in order, which this (stable) sort
+    # finds and merges.
+    pairs.sort(key=itemgetter(0), reverse=(not asc))
+
+    return pairs
+
+def row_size(cells):
+    """
+    Estimate the bytes of memory taken by a row of :cells:.
+    """
+    try:
+        n = sum(map(len, cells))
+    except TypeError:
+        n = sum(len(x) for x in cells if isinstance(x, basestring))
+    return ROW_OVERHEAD + CELL_OVERHEAD * len(cells) + n
+
+def record_of_row(row, key, schema):
+    """
+    The record of a run file for :row:. Rows of :schema: are stored
+    as their cells, other rows as dictionaries.
+    """
+    if isinstance(row, Row) and row.schema is schema:
+        return (key, row.cells, row.extras)
+    return (key, None, dict(row.iteritems()))
+
+def run_write(path, records, block_rows=RUN_BLOCK_ROWS):
+    with open(path, 'wb') as f:
+        records = iter(records)
+        while True:
+            block = list(islice(records, block_rows))
+            if not block:
+                break
+            marshal.dump(block, f)
+
+def run_read_g(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                block = marshal.load(f)
+            except EOFError:
+                return
+            for record in block:
+                yield record
+
+def runs_merge_g(paths, asc=True, ascs=None):
+    """
+    Merge run files, each of which is sorted, into one sorted stream
+    of records. Records with equal keys are taken from the runs in
+    the order of :paths:, so the merge is stable.
+
+    :param ascs: The orders of the columns of the keys, if they are
+        in both orders. The keys of the runs are then plain, see
+        :key_plain:, and are compared as by :key_orders:.
+    """
+
+    def decorated_g(i, path):
+        if ascs is not None:
+            for record in run_read_g(path):
+                yield (key_orders(record[0], ascs), i, record)
+        elif asc:
+            for record in run_read_g(path):
+                yield (record[0], i, record)
+        else:
+            for record in run_read_g(path):
+                yield (Descending(record[0]), i, record)
+
+    for k, i, record in merge(*[decorated_g(i, path) for i, path in enumerate(paths)]):
+        yield record
+
+def runs_sort_g(row_g, pairs_make, asc, buffer_size, temporary_directory=None, ascs=None):
+    """
+    Sort rows in bounded memory. Rows are sorted in runs of about
+    :buffer_size: bytes, and if there is more than one run then
+    each is written to a temporary file, and the runs are merged.
+
+    :param pairs_make: Sorts the keys of a run of rows, see :keys_sort:.
+    :param ascs: The orders of the columns of the keys, if they are in
+        both orders, see :key_make:. Default is None.
+    """
 
-    for row in sorted(row_g, key=key, reverse=(not asc)):
+    schema = None
+
+    directory = None
+
+    block_rows = None
+
+    try:
+
+        paths = []
+
+        while True:
+
+            rows = []
+            size = 0
+            for row in row_g:
+                rows.append(row)
+                if isinstance(row, Row):
+                    size += row_size(row.cells)
+                else:
+                    size += row_size(row.values())
+                if size >= buffer_size:
+                    break
+
+            if not rows:
+                break
+
+            if schema is None and isinstance(rows[0], Row):
+                schema = rows[0].schema
+
+            # Each key is made once, for the sort and for the run.
+            pairs = pairs_make(rows)
+
+            if not paths and size < buffer_size:
+                # Everything fits in one run, so it is not written.
+                for k, i in pairs:
+                    yield rows[i]
+                return
+
+            if directory is None:
+                directory = tempfile.mkdtemp(prefix='csvu-sort-', dir=temporary_directory)
+
+            if block_rows is None:
+                block_rows = max(1, min(RUN_BLOCK_ROWS, len(rows) // MERGE_FANIN))
+
+            path = os.path.join(directory, 'run-{}'.format(len(paths)))
+            if ascs is not None:
+                pairs = ((key_plain(k), i) for k, i in pairs)
+
+            run_write(path, (record_of_row(rows[i], k, schema) for k, i in pairs), block_rows)
+            paths.append(path)
+
+            rows = pairs = None
+
+        # Merge consecutive runs, so that the merge stays stable.
+        while len(paths) > MERGE_FANIN:
+            merged = []
+            for j in xrange(0, len(paths), MERGE_FANIN):
+                group = paths[j:j + MERGE_FANIN]
+                path = os.path.join(directory, 'run-{}-{}'.format(len(paths), j))
+                run_write(path, runs_merge_g(group, asc=asc, ascs=ascs), block_rows)
+                for p in group:
+                    os.remove(p)
+                merged.append(path)
+            paths = merged
+
+        for k, cells, extras in runs_merge_g(paths, asc=asc, ascs=ascs):
+            if cells is None:
+                yield extras
+            else:
+                yield Row(schema, cells, extras)
+
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def disorder_g(row_g, key, asc=True):
+    """
+    Pass rows through with their keys, as tuples (key, row), checking
+    that they are sorted.
+
+    :raises Disorder: At the first row out of order.
+    """
+    it = iter(row_g)
+    for row in it:
+        k0 = key(row)
+        yield k0, row
+        break
+    i = 0
+    for row in it:
+        i += 1
+        k = key(row)
+        if (k < k0) if asc else (k0 < k):
+            raise Disorder(i, row, k, k0)
+        yield k, row
+        k0 = k
+
+class Disorder(Exception):
+    """
+    A row out of order.
+
+    :param i: The number of the row, from 0.
+    :param row: The row.
+    :param key: The key of the row.
+    :param previous: The key of the row before.
+    """
+
+    def __init__(self, i, row, key, previous):
+        self.i = i
+        self.row = row
+        self.key = key
+        self.previous = previous
+        Exception.__init__(self, "Row {} is out of order, its key {!r} comes before {!r}".format(i, key, previous))
+
+def orders_key_make(cols, asc=True, numeric=False, nastrings=K_NASTRINGs, ascs=None):
+    """
+    Make the sort key of rows in the order :asc:, or in the orders
+    :ascs: per column, as does :filter_g:.
+
+    :returns: A tuple (key, asc), to sort with key=key, reverse=(not asc).
+    """
+    if ascs is None or len(set(ascs)) == 1:
+        if ascs is not None:
+            asc = ascs[0]
+        return key_make(cols, numeric=numeric, nastrings=nastrings), asc
+    return key_make(cols, numeric=numeric, nastrings=nastrings, ascs=ascs), True
+
+def disorder_find(row_g, cols, asc=True, numeric=False, nastrings=K_NASTRINGs, ascs=None):
+    """
+    Check that rows are sorted, in one pass.
+
+    :returns: The :Disorder: of the first row out of order, or None
+        if the rows are sorted.
+    """
+    key, asc = orders_key_make(cols, asc=asc, numeric=numeric, nastrings=nastrings, ascs=ascs)
+    try:
+        for k, row in disorder_g(row_g, key, asc=asc):
+            pass
+    except Disorder as exc:
+        return exc
+    return None
+
+def merge_g(row_gs, cols, asc=True, numeric=False, nastrings=K_NASTRINGs, names=None, ascs=None):
+    """
+    Merge rows which are sorted, in one pass.
+
+    :param row_gs: The sorted rows of each input.
+    :param names: The names of the inputs, for errors.
+
+    Rows with equal keys are taken from the inputs in the order of
+    :row_gs:, so the merge is the stable sort of the inputs one after
+    another.
+
+    :raises Exception: If an input is not sorted.
+    """
+
+    key, asc = orders_key_make(cols, asc=asc, numeric=numeric, nastrings=nastrings, ascs=ascs)
+
+    def decorated_g(i, row_g):
+        # The check of disorder_g, inlined, since this is per row.
+        k0 = None
+        for n, row in enumerate(row_g):
+            k = key(row)
+            if n and ((k < k0) if asc else (k0 < k)):
+                name = names[i] if names else i
+                raise Exception("Input {} is not sorted: {}".format(name, Disorder(n, row, k, k0)))
+            yield (k if asc else Descending(k)), i, row
+            k0 = k
+
+    for k, i, row in merge(*[decorated_g(i, row_g) for i, row_g in enumerate(row_gs)]):
         yield row
 
+def filter_g(row_g, cols, asc=True, numeric=False, nastrings=K_NASTRINGs, buffer_size=None, temporary_directory=None, parallel=1, limit=None, ascs=None):
+    """
+    :param row_g: Rows to sort. :row_g: must be a generator of dictionaries.
+    :param cols: Columns for keys. :cols: must be a generator of strings.
+    :param asc: Ascending or descending. :asc: must be bool.
+    :param numeric: Interpret keys as numeric. :asc: must be bool.
+    :param nastrings: Values to compare as equivalent to None in python term order.
+    :param buffer_size: The bytes of rows to sort in memory at a time, default
+        is None, which sorts every row in memory.
+    :param temporary_directory: The directory in which to write runs, default
+        is None, which is the default of :tempfile:.
+    :param parallel: The number of processes with which to sort, default is 1.
+    :param limit: The number of rows to return, default is None for every row.
+        Only :limit: rows are kept, in a heap, which are in the order
+        of a full sort.
+    :param ascs: Ascending or descending, per column of :cols:, default is
+        None, which is :asc: for each column.
+    """
+
+    if ascs is None:
+        ascs = [asc] * len(cols)
+
+    mixed = len(set(ascs)) > 1
+
+    key, asc = orders_key_make(cols, asc=asc, numeric=numeric, nastrings=nastrings, ascs=ascs)
+
+    if limit is not None:
+        # Ties are broken by the order of the rows, as in sorted(), so
+        # this is sorted(row_g, ...)[:limit] in O(n log limit) time.
+        if asc:
+            rows = nsmallest(limit, row_g, key=key)
+        else:
+            rows = nlargest(limit, row_g, key=key)
+        for row in rows:
+            yield row
+        return
+
+    pool = None
+
+    if parallel > 1:
+        # Imported here, since it is slow to import and only --parallel needs it.
+        import multiprocessing
+        pool = multiprocessing.Pool(parallel)
+
+    def pairs_make(rows):
+        return keys_sort(
+                    rows,
+                    cols=cols,
+                    key=key,
+                    asc=asc,
+                    numeric=numeric,
+                    nastrings=nastrings,
+                    pool=pool,
+                    jobs=parallel,
+                    ascs=ascs if mixed else None,
+                )
+
+    try:
+
+        if buffer_size is not None:
+            g = runs_sort_g(
+                        iter(row_g),
+                        pairs_make=pairs_make,
+                        asc=asc,
+                        buffer_size=buffer_size,
+                        temporary_directory=temporary_directory,
+                        ascs=ascs if mixed else None,
+                    )
+            for row in g:
+                yield row
+            return
+
+        if pool is not None:
+            rows = list(row_g)
+            for k, i in pairs_make(rows):
+                yield rows[i]
+            return
+
+        if numeric:
+            rows = list(row_g)
+            order = None
+            if len(rows) >= NUMPY_ROWS:
+                order = vector_order(rows, cols, ascs, numeric=numeric, nastrings=nastrings)
+            if order is not None:
+                for i in order:
+                    yield rows[i]
+                return
+            row_g = rows
+
+        for row in sorted(row_g, key=key, reverse=(not asc)):
+            yield row
+
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def offsets_sort(path, cols, asc=True, numeric=False, nastrings=K_NASTRINGs, ascs=None, dialect='sniff', headless=False, sniff_size=None, limit=None):
+    """
+    Sort the records of a regular CSV file by their keys, holding only
+    the keys and the byte offsets of the records in memory.
+
+    Records are found as by :csvu.records.MappedFile.spans:, and each
+    is parsed only to take its key. The records are then sliced from
+    the mapped file in order, so they are copied verbatim. Raises an
+    Exception if a record is not valid CSV.
+
+    Takes the arguments of :filter_g:, and those of :csvu.reader_make:
+    for the file at :path:.
+
+    :returns: A dictionary with the 'dialect' and 'fieldnames' of the
+        file, its raw 'header' record (None if :headless:), and a
+        generator of its raw 'records' in order.
+    """
+
+    from csvu import dialect_sniff
+
+    if compression_of_file(path) is not None:
+        raise Exception("Cannot sort a compressed file by offsets: {}".format(path))
+
+    m = MappedFile(path)
+
+    try:
+
+        if dialect == 'sniff':
+            dialect = dialect_sniff(m.sample(sniff_size))
+
+        try:
+            quotechar = quotechar_of(dialect)
+        except ValueError as exc:
+            raise Exception("Cannot sort {} by offsets: {}".format(path, exc))
+
+        buf = m.buf
+
+        spans = m.spans(quotechar=quotechar, dialect=dialect)
+
+        header = None
+        for s, e in spans:
+            header = buf[s:e]
+            break
+
+        if header is None:
+            if headless:
+                raise StopIteration
+            m.close()
+            return {'dialect': dialect, 'fieldnames': None, 'header': None, 'records': iter([])}
+
+        row0 = cells_parse(header, dialect)
+
+        # Records copied from the end of a file may lack a terminator.
+        terminator = '\r\n' if header.endswith('\r\n') else '\n'
+
+        if headless:
+            fieldnames = [str(i) for i, x in enumerate(row0)]
+            spans = chain([(s, e)], spans)
+            header = None
+        else:
+            fieldnames = row0
+            if not header.endswith('\n'):
+                header += terminator
+
+        for c in cols:
+            if not c in fieldnames:
+                raise Exception("Column not found: {}".format(c))
+
+        indexes = [fieldnames.index(c) for c in cols]
+        n = len(fieldnames)
+
+        starts = array('L')
+        stops  = array('L')
+        values = []
+
+        s = None
+        try:
+            for s, e in spans:
+                if not headless and e - s <= 2 and isblank(buf[s:e]):
+                    continue
+                cells = cells_parse(buf[s:e], dialect)
+                if len(cells) < n:
+                    cells.extend(None for i in xrange(n - len(cells)))
+                values.append(tuple([cells[j] for j in indexes]))
+                starts.append(s)
+                stops.append(e)
+        except Error as exc:
+            raise Exception("Cannot sort {} by offsets, a record at or after offset {} is not valid CSV: {}".format(path, s, exc))
+
+        if ascs is None:
+            ascs = [asc] * len(cols)
+
+        keys_cols = range(len(cols))
+
+        order = None
+
+        if numeric and limit is None and len(values) >= NUMPY_ROWS:
+            order = vector_order(values, keys_cols, ascs, numeric=numeric, nastrings=nastrings)
+
+        if order is None:
+            key, asc = orders_key_make(keys_cols, asc=asc, numeric=numeric, nastrings=nastrings, ascs=ascs)
+            keys = map(key, values)
+            values = None
+            if limit is not None:
+                # As in filter_g, ties are broken by the order of the records.
+                if asc:
+                    order = nsmallest(limit, xrange(len(keys)), key=keys.__getitem__)
+                else:
+                    order = nlargest(limit, xrange(len(keys)), key=keys.__getitem__)
+            else:
+                order = sorted(xrange(len(keys)), key=keys.__getitem__, reverse=(not asc))
+            keys = None
+
+        values = None
+
+    except:
+        m.close()
+        raise
+
+    def records_g():
+        try:
+            for i in order:
+                record = buf[starts[i]:stops[i]]
+                if not record.endswith('\n'):
+                    record += terminator
+                yield record
+        finally:
+            m.close()
+
+    return {'dialect': dialect, 'fieldnames': fieldnames, 'header': header, 'records': records_g()}
+
+def offsets_cli(parser, args):
+
+    if args.files or args.merge or args.check:
+        parser.error("--offsets sorts FILE0, so cannot be used with --files, --merge or --check")
+
+    if args.file0 == '-' or not os.path.isfile(args.file0):
+        parser.error("--offsets needs FILE0 to be a regular file")
+
+    if args.dialect1 != 'dialect0':
+        parser.error("--offsets copies records verbatim, so cannot change the dialect")
+
+    ascs = None
+    if args.orders is not None:
+        if len(args.orders) != len(args.columns):
+            parser.error("--orders needs one order for each of --columns")
+        ascs = [o == 'ascending' for o in args.orders]
+
+    d = offsets_sort(
+                    args.file0,
+                    cols=args.columns,
+                    asc=args.ascending,
+                    numeric=args.numeric,
+                    nastrings=args.nastrings,
+                    ascs=ascs,
+                    dialect=args.dialect0,
+                    headless=args.headless,
+                    sniff_size=args.sniff_size,
+                    limit=args.limit,
+                )
+
+    f = writer_file_make(
+                    file_or_path=args.file1,
+                    compression=args.compression,
+                    compression_level=args.compression_level,
+                )
+
+    if d['header'] is not None:
+        f.write(d['header'])
+    for record in d['records']:
+        f.write(record)
+    writer_file_done(f, args.file1)
+
 def cli():
 
     parser = cli_arg_parser()
@@ -111,28 +976,93 @@ def cli():
 
     try:
 
-        reader_d = reader_make(
-                        file_or_path=args.file0,
-                        dialect=args.dialect0,
-                        headless=args.headless,
-                    )
+        if args.offsets:
+            offsets_cli(parser, args)
+            return
 
-        dialect0   = reader_d['dialect']
-        fieldnames = reader_d['fieldnames']
-        reader_g   = reader_d['reader']
+        files = args.files or [args.file0]
+
+        if len(files) > 1 and not (args.merge or args.check):
+            parser.error("--files needs --merge or --check, to sort several files use csvu-cat first")
+
+        dialect0   = None
+        fieldnames = None
+        readers_g  = []
+
+        # --check reads only the keys, so with --cache only their
+        # columns are loaded.
+        columns = args.columns if args.check else None
+
+        for fname in files:
+
+            reader_d = reader_make(
+                            file_or_path=fname,
+                            dialect=args.dialect0,
+                            sniff_size=args.sniff_size,
+                            mmap=args.mmap,
+                            jobs=args.jobs,
+                            cache=args.cache,
+                            headless=args.headless,
+                            columns=columns,
+                        )
+
+            if fieldnames is None:
+                dialect0   = reader_d['dialect']
+                fieldnames = reader_d['fieldnames']
+            elif reader_d['fieldnames'] != fieldnames:
+                raise Exception("Column mismatch: {}: {} != {}".format(fname, fieldnames, reader_d['fieldnames']))
+
+            readers_g.append(reader_d['reader'])
 
         for c in args.columns:
             if not c in fieldnames:
                 m = 'Requested column {c} not found, available options are: {fieldnames}'.format(c=c, fieldnames=fieldnames)
                 parser.error(m)
 
-        g = filter_g(
-                        row_g=reader_g,
-                        cols=args.columns,
-                        asc=args.ascending,
-                        numeric=args.numeric,
-                        nastrings=args.nastrings,
-                    )
+        ascs = None
+        if args.orders is not None:
+            if len(args.orders) != len(args.columns):
+                parser.error("--orders needs one order for each of --columns")
+            ascs = [o == 'ascending' for o in args.orders]
+
+        if args.check:
+            for fname, reader_g in zip(files, readers_g):
+                disorder = disorder_find(
+                                row_g=reader_g,
+                                cols=args.columns,
+                                asc=args.ascending,
+                                numeric=args.numeric,
+                                nastrings=args.nastrings,
+                                ascs=ascs,
+                            )
+                if disorder is not None:
+                    sys.stderr.write('{}: {}: {}\n'.format(parser.prog, fname, disorder))
+                    sys.exit(1)
+            return
+
+        if args.merge:
+            g = merge_g(
+                            row_gs=readers_g,
+                            cols=args.columns,
+                            asc=args.ascending,
+                            numeric=args.numeric,
+                            nastrings=args.nastrings,
+                            names=files,
+                            ascs=ascs,
+                        )
+        else:
+            g = filter_g(
+                            row_g=readers_g[0],
+                            cols=args.columns,
+                            asc=args.ascending,
+                            numeric=args.numeric,
+                            nastrings=args.nastrings,
+                            buffer_size=args.buffer_size,
+                            temporary_directory=args.temporary_directory,
+                            parallel=args.parallel,
+                            limit=args.limit,
+                            ascs=ascs,
+                        )
 
         dialect1 = args.dialect1
 
@@ -141,6 +1071,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames,
@@ -152,8 +1084,3 @@ def cli():
 
         m = traceback.format_exc()
         parser.error(m)
-
-
-
-
-
@@ -0,0 +1,188 @@
+
+import atexit
+from functools import wraps
+import json
+import os
+import stat
+import sys
+import time
+
+from csvu.compress import DecompressedFile
+
+STATS_INTERVAL = 10.0
+
+# The number of rows between looks at the clock.
+STATS_ROWS = 1024
+
+def seconds_format(t):
+    t = int(t)
+    return '{}:{:02d}:{:02d}'.format(t // 3600, t // 60 % 60, t % 60)
+
+class Input(object):
+    """
+    The position in, and the size of, an input file, as far as they
+    can be known. Compressed files are measured in compressed bytes,
+    and a cache in the bytes of the cache. A mapped file, see
+    :csvu.records.MappedFile:, tells the end of the last record read.
+    """
+
+    def __init__(self, f):
+        if isinstance(f, DecompressedFile):
+            f = f.raw
+        self.f = f
+        self.position = None
+        self.size = None
+        try:
+            st = os.fstat(f.fileno())
+            if stat.S_ISREG(st.st_mode):
+                self.size = st.st_size
+        except (AttributeError, IOError, OSError, ValueError):
+            pass
+
+    def tell(self):
+        try:
+            self.position = self.f.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            pass
+        return self.position
+
+class Stats(object):
+    """
+    Counters of the rows read and written by a tool, reported to
+    STDERR every :interval: seconds, and as a line of JSON on exit.
+
+    :param interval: The number of seconds between reports.
+    """
+
+    def __init__(self, interval=STATS_INTERVAL):
+        self.interval = interval
+        self.name = os.path.basename(sys.argv[0])
+        self.t0 = time.time()
+        self.next = self.t0 + interval
+        self.rows_read = 0
+        self.rows_written = 0
+        self.inputs = []
+
+    def input_add(self, f):
+        self.inputs.append(Input(f))
+
+    def bytes_read(self):
+        positions = [i.tell() for i in self.inputs]
+        if not positions or None in positions:
+            return None
+        return sum(positions)
+
+    def bytes_total(self):
+        sizes = [i.size for i in self.inputs]
+        if not sizes or None in sizes:
+            return None
+        return sum(sizes)
+
+    def read_g(self, g):
+        for x in g:
+            self.rows_read += 1
+            if not self.rows_read % STATS_ROWS:
+                self.poll()
+            yield x
+
+    def write_g(self, g):
+        for x in g:
+            self.rows_written += 1
+            if not self.rows_written % STATS_ROWS:
+                self.poll()
+            yield x
+
+    def poll(self):
+        now = time.time()
+        if now >= self.next:
+            self.next = now + self.interval
+            self.report(now)
+
+    def report(self, now):
+
+        t = now - self.t0
+        n = self.bytes_read()
+        N = self.bytes_total()
+
+        m = '{}: read {} rows'.format(self.name, self.rows_read)
+        if n is not None:
+            m += ', {:.1f} MB'.format(n / 1e6)
+            if N:
+                m += ' of {:.1f} MB ({:.0f}%)'.format(N / 1e6, 100.0 * n / N)
+        m += ', wrote {} rows'.format(self.rows_written)
+        if t > 0:
+            m += ', {:.0f} rows/s read, {:.0f} rows/s written'.format(self.rows_read / t, self.rows_written / t)
+            if n is not None:
+                m += ', {:.1f} MB/s'.format(n / 1e6 / t)
+        if n and N and n < N and t > 0:
+            m += ', ETA {}'.format(seconds_format((N - n) * t / n))
+        m += ', elapsed {}\n'.format(seconds_format(t))
+
+        sys.stderr.write(m)
+
+    def summary(self):
+
+        t = time.time() - self.t0
+        n = self.bytes_read()
+
+        d = {
+                'tool'        : self.name,
+                'seconds'     : t,
+                'rows_read'   : self.rows_read,
+                'rows_written': self.rows_written,
+                'bytes_read'  : n,
+                'bytes_total' : self.bytes_total(),
+                'rows_per_sec': self.rows_read / t if t > 0 else None,
+                'mb_per_sec'  : n / 1e6 / t if n is not None and t > 0 else None,
+            }
+
+        sys.stderr.write(json.dumps(d, sort_keys=True) + '\n')
+
+_stats = None
+
+def stats_current():
+    """
+    The :Stats: of this process, or None if it is not counted.
+    """
+    return _stats
+
+def stats_start(interval=None):
+    """
+    Count the rows read and written by this process until it exits.
+    """
+    global _stats
+    if _stats is None:
+        _stats = Stats(interval=interval or STATS_INTERVAL)
+        atexit.register(_stats.summary)
+    elif interval is not None:
+        _stats.interval = interval
+        _stats.next = _stats.t0 + interval
+    return _stats
+
+def reader_counted(f):
+    """
+    Decorate :csvu.reader_make: to count the rows read.
+    """
+    @wraps(f)
+    def g(*args, **kwargs):
+        d = f(*args, **kwargs)
+        s = _stats
+        if s is not None:
+            d['reader'] = s.read_g(d['reader'])
+        return d
+    return g
+
+def writer_counted(f):
+    """
+    Decorate :csvu.writer_make: to count the rows written.
+    """
+    @wraps(f)
+    def g(*args, **kwargs):
+        wf = f(*args, **kwargs)
+        s = _stats
+        if s is None:
+            return wf
+        def wf1(gen):
+            return wf(s.write_g(gen))
+        return wf1
+    return g
@@ -1,4 +1,7 @@
 
+from collections import deque
+
+import os
 import traceback
 
 from csvu import (
@@ -9,10 +12,15 @@ from csvu.cli import (
         default_arg_parser, 
         positive_int,
     )
+from csvu.compress import compression_of_file
+from csvu.offsets import tail_reader_make
 
 def cli_arg_parser():
 
-    description = 'CSVU Tail is like GNU Tail, but for CSV files.'
+    description = '''CSVU Tail is like GNU Tail, but for CSV files.
+                     A regular file is read backwards from its end,
+                     or from its index, see csvu-index, so only the
+                     last rows are read.'''
 
     parser = default_arg_parser(
                     description=description,
@@ -32,8 +40,7 @@ def cli_arg_parser():
     return parser
 
 def filter_g(row_g, count, debug=False):
-    L = list(row_g)
-    for row in L[-count:]:
+    for row in deque(row_g, maxlen=count):
         yield row
 
 def cli():
@@ -44,20 +51,46 @@ def cli():
 
     try:
 
-        reader_d = reader_make(
-                        file_or_path=args.file0,
-                        dialect=args.dialect0,
-                        headless=args.headless,
-                    )
+        reader_d = None
+
+        if (
+                not args.cache
+                and args.file0 != '-'
+                and os.path.isfile(args.file0)
+                and compression_of_file(args.file0) is None
+            ):
+            try:
+                reader_d = tail_reader_make(
+                                args.file0,
+                                count=args.count,
+                                dialect=args.dialect0,
+                                headless=args.headless,
+                                sniff_size=args.sniff_size,
+                            )
+                g = reader_d['reader']
+            except ValueError:
+                # The records cannot be scanned, so stream the file.
+                pass
+
+        if reader_d is None:
+
+            reader_d = reader_make(
+                            file_or_path=args.file0,
+                            dialect=args.dialect0,
+                            sniff_size=args.sniff_size,
+                            mmap=args.mmap,
+                            jobs=args.jobs,
+                            cache=args.cache,
+                            headless=args.headless,
+                        )
+
+            g = filter_g(
+                            row_g=reader_d['reader'],
+                            count=args.count,
+                        )
 
         dialect0   = reader_d['dialect']
         fieldnames = reader_d['fieldnames']
-        reader_g   = reader_d['reader']
-
-        g = filter_g(
-                        row_g=reader_g,
-                        count=args.count,
-                    )
 
         dialect1 = args.dialect1
 
@@ -66,6 +99,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames,
@@ -41,18 +41,14 @@ def filter_g(row_g, set0, set1, cols=None):
 
     table = string.maketrans(set0, set1)
 
-    def maybe_tr(k, v):
-        tr = False
+    for row in row_g:
         if cols is None:
-            tr = True
+            keys = row.keys()
         else:
-            tr = k in cols 
-        if tr:
-            return string.translate(v, table)
-        return v
-
-    for row in row_g:
-        yield {k: maybe_tr(k, v) for k, v in row.iteritems()}
+            keys = [k for k in cols if k in row]
+        for k in keys:
+            row[k] = string.translate(row[k], table)
+        yield row
     
 def cli():
 
@@ -65,6 +61,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                         headless=args.headless,
                     )
 
@@ -92,6 +92,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=args.headless,
                         fieldnames=fieldnames,
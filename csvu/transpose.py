@@ -7,6 +7,7 @@ from csvu import (
         writer_make,
     )
 from csvu.cli import default_arg_parser
+from csvu.row import Row, Schema
 
 def cli_arg_parser():
     
@@ -36,9 +37,11 @@ def filter_d(row_g, fieldnames):
 
     keys = [str(i) for i in range(m)]
 
+    schema = Schema(keys)
+
     def g():
         for row in izip(*rows):
-            yield {i: c for i, c in izip(keys, row)}
+            yield Row(schema, list(row))
 
     return {'fieldnames': keys, 'generator': g()}
 
@@ -53,6 +56,10 @@ def cli():
         reader_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
                         headless=True,
                     )
 
@@ -75,6 +82,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect1,
                         headless=True,
                         fieldnames=fieldnames,
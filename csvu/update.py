@@ -134,12 +134,22 @@ def cli():
         reader0_d = reader_make(
                         file_or_path=args.file0,
                         dialect=args.dialect0,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        prefetch=True,
                         headless=args.headless,
                     )
 
         reader1_d = reader_make(
                         file_or_path=args.file1,
                         dialect=args.dialect1,
+                        sniff_size=args.sniff_size,
+                        mmap=args.mmap,
+                        jobs=args.jobs,
+                        cache=args.cache,
+                        prefetch=True,
                         headless=args.headless,
                     )
 
@@ -178,6 +188,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file2,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=dialect2,
                         headless=args.headless,
                         fieldnames=fieldnames2,
@@ -1,11 +1,11 @@
 
 from cStringIO import StringIO
 from itertools import izip_longest
-import openpyxl
 import sys
 import traceback
 
 from csvu import writer_make
+from csvu.row import Row, Schema
 from csvu.cli import (
         default_arg_parser, 
         nonnegative_int,
@@ -48,6 +48,7 @@ def cli_arg_parser():
     return parser
 
 def filter_d(f, sheet=0):
+    import openpyxl
     wb = openpyxl.load_workbook(f, use_iterators=True)
     N  = len(wb.worksheets)   
     if not (0 <= sheet < N):
@@ -56,9 +57,11 @@ def filter_d(f, sheet=0):
     M = max(len(row) for row in ws.rows)
     K = [str(i) for i in range(M)]
 
+    schema = Schema(K)
+
     def g():
         for row in ws.rows:
-            yield {k: (c.value or '') for k, c in izip_longest(K, row, fillvalue='')}
+            yield Row(schema, [(c.value or '') for k, c in izip_longest(K, row, fillvalue='')])
 
     return {'fieldnames': K, 'generator': g()}
 
@@ -90,6 +93,8 @@ def cli():
 
         writer_f = writer_make(
                         file_or_path=args.file1,
+                        compression=args.compression,
+                        compression_level=args.compression_level,
                         dialect=args.dialect1,
                         headless=True,
                         fieldnames=fieldnames,
@@ -16,6 +16,7 @@ setup(
                 'pyxdameraulevenshtein',
             ],
         scripts=[
+                    'bin/csvu',
                     'bin/csvu-cat',
                     'bin/csvu-column-rename',
                     'bin/csvu-cut',
@@ -23,11 +24,14 @@ setup(
                     'bin/csvu-diff',
                     'bin/csvu-grep',
                     'bin/csvu-head',
+                    'bin/csvu-index',
                     'bin/csvu-levenshtein',
+                    'bin/csvu-pipe',
                     'bin/csvu-pretty',
                     'bin/csvu-put',
                     'bin/csvu-rank',
                     'bin/csvu-row-reduce',
+                    'bin/csvu-slice',
                     'bin/csvu-sniff',
                     'bin/csvu-sort',
                     'bin/csvu-tail',
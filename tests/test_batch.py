@@ -0,0 +1,61 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from csvu import reader_make
+
+# Numbers and NA in several spellings, which are converted in the
+# batch but are to come back as they were written.
+NUMBERS = 'id,num,text\n1,0,a\n2,NA,b\n3, na ,c\n4,1e3,d\n5,,e\n6,-0.50,f\n'
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'n.csv')
+        with open(self.path, 'wb') as f:
+            f.write(NUMBERS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_columns(self):
+        from csvu.batch import batch_reader_make
+        reader_d = batch_reader_make(file_or_path=self.path, dialect='excel', size=4)
+        batches = list(reader_d['reader'])
+        self.assertEqual([len(batch) for batch in batches], [4, 2])
+        self.assertEqual(batches[0].mask('num').tolist(), [False, True, True, False])
+        self.assertEqual(batches[0]['num'][[0, 3]].tolist(), [0.0, 1000.0])
+        self.assertIsNone(batches[0].mask('text'))
+
+    def test_rows_round_trip(self):
+        from csvu.batch import batch_reader_make, batch_rows_g
+        reader_d = reader_make(self.path, dialect='excel')
+        rows = [row.values() for row in reader_d['reader']]
+        for size in (1, 4, 64):
+            reader_d = batch_reader_make(file_or_path=self.path, dialect='excel', size=size)
+            rows1 = [row.values() for row in batch_rows_g(reader_d['reader'])]
+            self.assertEqual(rows1, rows)
+
+    def test_sum0(self):
+        from csvu.batch import batch_reader_make, column_mean0, column_sum0
+        reader_d = batch_reader_make(file_or_path=self.path, dialect='excel', size=4)
+        self.assertEqual(column_sum0(reader_d['reader'], 'num'), 999.5)
+        reader_d = batch_reader_make(file_or_path=self.path, dialect='excel', size=4)
+        self.assertEqual(column_mean0(reader_d['reader'], 'num'), 999.5 / 6)
+
+    def test_not_a_number(self):
+        from csvu.batch import batch_reader_make
+        reader_d = batch_reader_make(file_or_path=self.path, dialect='excel', numeric=['text'])
+        self.assertRaises(Exception, list, reader_d['reader'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from csvu import reader_make
+from csvu.cache import cache_open
+
+TEXT = 'a,b,c\n1,"x\ny",2\n3,NA,4\n5,z,\n'
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'c.csv')
+        with open(self.path, 'wb') as f:
+            f.write(TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, **kwargs):
+        reader_d = reader_make(self.path, dialect='excel', **kwargs)
+        return reader_d['fieldnames'], [row.values() for row in reader_d['reader']]
+
+    def build(self):
+        expected = self.read()
+        self.assertIsNone(cache_open(self.path))
+        self.assertEqual(self.read(cache=True), expected)
+        c = cache_open(self.path)
+        self.assertIsNotNone(c)
+        c.close()
+        return expected
+
+    def test_rows(self):
+        expected = self.build()
+        self.assertEqual(self.read(cache=True), expected)
+        self.assertEqual(self.read(cache=True, columns=['c', 'a']), self.read(columns=['c', 'a']))
+
+    def test_touched(self):
+        self.build()
+        st = os.stat(self.path)
+        os.utime(self.path, (st.st_atime, st.st_mtime + 10))
+        self.assertIsNone(cache_open(self.path))
+
+    def test_changed(self):
+        self.build()
+        st = os.stat(self.path)
+        with open(self.path, 'ab') as f:
+            f.write('7,w,8\n')
+        os.utime(self.path, (st.st_atime, st.st_mtime))
+        self.assertIsNone(cache_open(self.path))
+        # The cache is rebuilt as the file is read.
+        self.assertEqual(self.read(cache=True)[1][-1], ['7', 'w', '8'])
+        c = cache_open(self.path)
+        self.assertIsNotNone(c)
+        c.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+
+import bz2
+from cStringIO import StringIO
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from csvu import reader_make, writer_make
+from csvu.compress import (
+        CompressedFile,
+        compression_of_file,
+        lzma_import,
+        reader_file_make,
+    )
+
+try:
+    lzma = lzma_import()
+except Exception:
+    lzma = None
+
+FIELDNAMES = ['a', 'b', 'c']
+
+ROWS = [['1', 'x\ny', '2'], ['3', 'NA', ''], ['5', 'z,"q"', '6']] * 1000
+
+def codecs_g():
+    yield 'gzip', '.gz', gzip.GzipFile
+    yield 'bz2', '.bz2', bz2.BZ2File
+    if lzma is not None:
+        yield 'xz', '.xz', lzma.LZMAFile
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.plain = os.path.join(self.directory, 'p.csv')
+        self.write(self.plain)
+        with open(self.plain, 'rb') as f:
+            self.text = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, path, **kwargs):
+        writer_f = writer_make(FIELDNAMES, file_or_path=path, dialect='excel', **kwargs)
+        writer_f(ROWS)
+
+    def read(self, path):
+        reader_d = reader_make(path, dialect='excel')
+        return reader_d['fieldnames'], [row.values() for row in reader_d['reader']]
+
+    def test_plain(self):
+        self.assertIsNone(compression_of_file(self.plain))
+        self.assertEqual(self.read(self.plain), (FIELDNAMES, ROWS))
+
+    def test_round_trip(self):
+        for compression, ext, open_f in codecs_g():
+            path = os.path.join(self.directory, 'x.csv')
+            self.write(path, compression=compression)
+            self.assertEqual(compression_of_file(path), compression)
+            self.assertEqual(self.read(path), (FIELDNAMES, ROWS), compression)
+            f = open_f(path, 'rb')
+            try:
+                self.assertEqual(f.read(), self.text, compression)
+            finally:
+                f.close()
+
+    def test_extension(self):
+        # The compression of an output path is taken from its extension.
+        for compression, ext, open_f in codecs_g():
+            path = os.path.join(self.directory, 'x.csv' + ext)
+            self.write(path)
+            self.assertEqual(compression_of_file(path), compression)
+            self.assertEqual(self.read(path), (FIELDNAMES, ROWS), compression)
+
+    def test_concatenated(self):
+        # As written by `cat a.gz b.gz`.
+        for compression, ext, open_f in codecs_g():
+            parts = []
+            for i in xrange(2):
+                path = os.path.join(self.directory, 'x{}.csv'.format(i))
+                self.write(path, compression=compression)
+                with open(path, 'rb') as f:
+                    parts.append(f.read())
+            path = os.path.join(self.directory, 'x.csv')
+            with open(path, 'wb') as f:
+                f.write(''.join(parts))
+            self.assertEqual(self.read(path), (FIELDNAMES, ROWS + [FIELDNAMES] + ROWS), compression)
+
+    def test_stream(self):
+        # A stream is detected by its magic bytes, as is STDIN.
+        for compression, ext, open_f in codecs_g():
+            path = os.path.join(self.directory, 'x.csv')
+            self.write(path, compression=compression)
+            with io.open(path, 'rb') as raw:
+                f, compression1 = reader_file_make(raw)
+                self.assertEqual(compression1, compression)
+                self.assertEqual(f.read(), self.text)
+
+    def test_flush(self):
+        for compression, ext, open_f in codecs_g():
+            raw = StringIO()
+            f = CompressedFile(raw, compression, close_raw=False)
+            f.write(self.text)
+            f.flush()
+            f.write(self.text)
+            f.close()
+            self.assertFalse(raw.closed)
+            g, compression1 = reader_file_make(io.BufferedReader(io.BytesIO(raw.getvalue())))
+            self.assertEqual(compression1, compression)
+            self.assertEqual(g.read(), self.text * 2, compression)
+
+if __name__ == '__main__':
+    unittest.main()
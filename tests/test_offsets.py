@@ -0,0 +1,49 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from csvu import reader_make
+from csvu.offsets import (
+        index_build,
+        index_open,
+        range_reader_make,
+    )
+
+# A quote inside an unquoted field is kept as is by the csv module,
+# but it puts out the quote parity by which records are scanned for.
+STRAY_QUOTES = 'id,v,w\n1,a"b,2\n2,x,3\n3,c"d,4\n4,z,5\n'
+
+class TestIndexStrayQuotes(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'q.csv')
+        with open(self.path, 'wb') as f:
+            f.write(STRAY_QUOTES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def slice(self, start, stop):
+        index = index_open(self.path, dialect='excel')
+        self.assertIsNotNone(index)
+        reader_d = range_reader_make(index, self.path, start=start, stop=stop)
+        return [row.values() for row in reader_d['reader']]
+
+    def test_slice(self):
+        self.assertEqual(index_build(self.path, dialect='excel', stride=1), 4)
+        self.assertEqual(self.slice(1, 3), [['2', 'x', '3'], ['3', 'c"d', '4']])
+
+    def test_slices_match_reader(self):
+        reader_d = reader_make(self.path, dialect='excel')
+        rows = [row.values() for row in reader_d['reader']]
+        for stride in (1, 2, 64):
+            index_build(self.path, dialect='excel', stride=stride)
+            for start in range(len(rows) + 1):
+                for stop in range(start, len(rows) + 2):
+                    self.assertEqual(self.slice(start, stop), rows[start:stop])
+
+if __name__ == '__main__':
+    unittest.main()
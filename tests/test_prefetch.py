@@ -0,0 +1,98 @@
+
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from csvu import reader_make
+from csvu.diff import filter_d
+from csvu.prefetch import (
+        PREFETCH_BLOCKS,
+        PREFETCH_LINES,
+        Prefetch,
+    )
+
+def prefetch_threads():
+    return [t for t in threading.enumerate() if t.name == 'csvu-prefetch']
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # Enough lines that the thread fills its queue and then waits.
+        self.n = PREFETCH_LINES * (PREFETCH_BLOCKS + 8)
+        self.long = os.path.join(self.directory, 'long.csv')
+        with open(self.long, 'wb') as f:
+            f.write('a,b\n')
+            for i in xrange(self.n):
+                if i % 1000 == 0:
+                    f.write('{},"x\ny"\n'.format(i))
+                else:
+                    f.write('{},x\n'.format(i))
+        self.short = os.path.join(self.directory, 'short.csv')
+        with open(self.short, 'wb') as f:
+            f.write('a,b\n0,"x\ny"\n1,z\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def wait(self):
+        # Threads end on their own once stopped, after their last read.
+        gc.collect()
+        for i in xrange(100):
+            if not prefetch_threads():
+                break
+            time.sleep(0.05)
+        self.assertEqual(prefetch_threads(), [])
+
+    def read(self, path, **kwargs):
+        reader_d = reader_make(path, dialect='excel', **kwargs)
+        return reader_d['fieldnames'], [row.values() for row in reader_d['reader']]
+
+    def test_rows(self):
+        for path in (self.short, self.long):
+            self.assertEqual(self.read(path, prefetch=True), self.read(path))
+        self.wait()
+
+    def test_blocks(self):
+        lines = ['{}\n'.format(i) for i in xrange(100)]
+        for n in (1, 3, 100, 1000):
+            self.assertEqual(list(Prefetch(iter(lines), lines=n, blocks=2)), lines)
+        self.wait()
+
+    def test_error(self):
+        def lines_g():
+            yield 'a\n'
+            raise IOError('broken')
+        self.assertRaises(IOError, list, Prefetch(lines_g()))
+        self.wait()
+
+    def test_stop_early(self):
+        reader_d = reader_make(self.long, dialect='excel', prefetch=True)
+        reader_g = reader_d['reader']
+        for i, row in zip(xrange(10), reader_g):
+            pass
+        self.assertEqual(len(prefetch_threads()), 1)
+        del reader_d, reader_g
+        self.wait()
+
+    def test_diff_unequal(self):
+        # diff stops at the end of the shorter input.
+        reader0_d = reader_make(self.short, dialect='excel', prefetch=True)
+        reader1_d = reader_make(self.long, dialect='excel', prefetch=True)
+        d = filter_d(
+                    row0_g=reader0_d['reader'],
+                    row1_g=reader1_d['reader'],
+                    fieldnames0=reader0_d['fieldnames'],
+                    fieldnames1=reader1_d['fieldnames'],
+                )
+        rows = [row.values() for row in d['generator']]
+        self.assertEqual(rows, [[None, None], [None, 'x']])
+        del reader0_d, reader1_d, d
+        self.wait()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+
+from StringIO import StringIO
+import os
+import shutil
+import tempfile
+import unittest
+
+from csvu import reader_make, writer_make
+
+# A long row and a short row, which the pretty writer is to cut and pad.
+RAGGED = 'a,b\n1,2,3,4\n5\n6,7\n'
+
+class TestPrettyRagged(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'r.csv')
+        with open(self.path, 'wb') as f:
+            f.write(RAGGED)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ragged(self):
+        reader_d = reader_make(self.path, dialect='excel')
+        f = StringIO()
+        writer_f = writer_make(reader_d['fieldnames'], file_or_path=f, dialect='pretty')
+        writer_f(reader_d['reader'])
+        self.assertEqual(f.getvalue().splitlines(), [
+                '+---+------+',
+                '| a | b    |',
+                '+---+------+',
+                '| 1 | 2    |',
+                '| 5 | None |',
+                '| 6 | 7    |',
+                '+---+------+',
+            ])
+
+    def test_ragged_csv(self):
+        # The CSV writer still refuses cells it has no column for.
+        reader_d = reader_make(self.path, dialect='excel')
+        writer_f = writer_make(reader_d['fieldnames'], file_or_path=StringIO(), dialect='excel')
+        self.assertRaises(ValueError, writer_f, reader_d['reader'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from csvu import reader_make
+import csvu.records
+from csvu.records import (
+        MappedFile,
+        mmap_reader_make,
+        parallel_reader_make,
+    )
+
+FILES = {
+        'newlines'  : 'a,b,c\n1,"x\ny",2\n3,"p\n\nq",4\n5,z,6\n',
+        'crlf'      : 'a,b,c\r\n1,"x\r\ny",2\r\n3,y,4\r\n',
+        'unended'   : 'a,b,c\n1,x,2\n3,"y\nz",4',
+        'blank'     : 'a,b,c\n1,x,2\n\n3,y,4\n\n',
+        'ragged'    : 'a,b,c\n1,x\n3,y,4,5\n',
+        'quotes'    : 'a,b,c\n1,a"b,2\n2,x,3\n3,c"d,4\n4,"z\n""",5\n',
+        'header'    : 'a,b,c\n',
+        'empty'     : '',
+    }
+
+class Tracked(MappedFile):
+    """
+    A :MappedFile: which remembers whether it was closed.
+    """
+
+    instances = []
+
+    def __init__(self, path):
+        MappedFile.__init__(self, path)
+        self.closed = False
+        Tracked.instances.append(self)
+
+    def close(self):
+        self.closed = True
+        MappedFile.close(self)
+
+class TestReaders(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = {}
+        for name, text in FILES.iteritems():
+            path = os.path.join(self.directory, name + '.csv')
+            with open(path, 'wb') as f:
+                f.write(text)
+            self.paths[name] = path
+        Tracked.instances = []
+        csvu.records.MappedFile = Tracked
+
+    def tearDown(self):
+        csvu.records.MappedFile = MappedFile
+        shutil.rmtree(self.directory)
+
+    def read(self, reader_f, path, **kwargs):
+        try:
+            reader_d = reader_f(path, dialect='excel', **kwargs)
+        except StopIteration:
+            return None
+        except Exception as exc:
+            # The readers are to fail alike, e.g. for a missing column.
+            return str(exc)
+        return reader_d['fieldnames'], [row.values() for row in reader_d['reader']]
+
+    def assertClosed(self):
+        self.assertTrue(Tracked.instances)
+        self.assertTrue(all(m.closed for m in Tracked.instances))
+        Tracked.instances = []
+
+    def check(self, **kwargs):
+        for name, path in sorted(self.paths.iteritems()):
+            expected = self.read(reader_make, path, **kwargs)
+            actual = self.read(mmap_reader_make, path, **kwargs)
+            self.assertEqual(actual, expected, (name, kwargs))
+            self.assertClosed()
+            for chunk_size in (1, 7, 1024):
+                actual = self.read(parallel_reader_make, path, jobs=2, chunk_size=chunk_size, **kwargs)
+                self.assertEqual(actual, expected, (name, kwargs, chunk_size))
+                self.assertClosed()
+
+    def test_rows(self):
+        self.check()
+
+    def test_headless(self):
+        self.check(headless=True)
+
+    def test_columns(self):
+        self.check(columns=['c', 'a'])
+
+    def test_columns_headless(self):
+        self.check(headless=True, columns=['1'])
+
+    def test_empty_headless(self):
+        path = self.paths['empty']
+        self.assertRaises(StopIteration, mmap_reader_make, path, dialect='excel', headless=True)
+        self.assertClosed()
+        self.assertRaises(StopIteration, parallel_reader_make, path, dialect='excel', headless=True, jobs=2)
+        self.assertClosed()
+
+    def test_column_not_found(self):
+        path = self.paths['newlines']
+        self.assertRaises(Exception, mmap_reader_make, path, dialect='excel', columns=['x'])
+        self.assertClosed()
+        self.assertRaises(Exception, parallel_reader_make, path, dialect='excel', columns=['x'], jobs=2)
+        self.assertClosed()
+
+if __name__ == '__main__':
+    unittest.main()
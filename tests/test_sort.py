@@ -0,0 +1,188 @@
+
+from cStringIO import StringIO
+from csv import reader, writer
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from csvu import reader_make
+import csvu.sort
+from csvu.sort import (
+        disorder_find,
+        filter_g,
+        merge_g,
+        offsets_sort,
+    )
+
+COLUMNS = [['key'], ['num'], ['key', 'num'], ['num', 'text']]
+
+ORDERS = [[True], [False], [True, False], [False, True]]
+
+def rows_write(f, n, seed=0):
+    """
+    Write :n: rows with few distinct keys, so that there are ties, which
+    the id column tells apart. Some cells are NA, some numbers are not,
+    and some texts have a newline, a comma or a quote in them.
+    """
+    r = random.Random(seed)
+    w = writer(f)
+    w.writerow(['id', 'key', 'num', 'text'])
+    for i in xrange(n):
+        key = r.choice(['a', 'b', 'B', ' c', 'NA', ''])
+        num = r.choice(['1', '2', '10', '-3.5', '1e2', 'NA', 'x', ''])
+        text = r.choice(['t', 'line\nbreak', 'com,ma', 'qu"ote', 'NONE'])
+        w.writerow([str(i), key, num, text])
+
+def cases_g():
+    for cols in COLUMNS:
+        for ascs in ORDERS:
+            if len(ascs) != len(cols):
+                continue
+            for numeric in (False, True):
+                yield cols, ascs, numeric
+
+class TestSort(unittest.TestCase):
+
+    n = 600
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 's.csv')
+        with open(self.path, 'wb') as f:
+            rows_write(f, self.n)
+        self.constants = dict(
+                (k, getattr(csvu.sort, k)) for k in ['MERGE_FANIN', 'NUMPY_ROWS', 'PARALLEL_ROWS']
+            )
+
+    def tearDown(self):
+        for k, v in self.constants.iteritems():
+            setattr(csvu.sort, k, v)
+        shutil.rmtree(self.directory)
+
+    def rows(self):
+        return list(reader_make(self.path, dialect='excel')['reader'])
+
+    def sort(self, rows, cols, ascs, numeric, **kwargs):
+        rows = [row.copy() for row in rows]
+        g = filter_g(iter(rows), cols, asc=ascs[0], numeric=numeric, ascs=ascs, **kwargs)
+        return [row.values() for row in g]
+
+    def expected(self, rows, cols, ascs, numeric):
+        # The plain in-memory sort, which is stable.
+        return self.sort(rows, cols, ascs, numeric)
+
+    def test_stable(self):
+        rows = self.rows()
+        key = csvu.sort.key_make(['key'])
+        expected = [row.values() for row in sorted(rows, key=key)]
+        self.assertEqual(self.sort(rows, ['key'], [True], False), expected)
+
+    def test_buffer_size(self):
+        # Small runs, merged two at a time, so that runs of runs are merged.
+        csvu.sort.MERGE_FANIN = 2
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            expected = self.expected(rows, cols, ascs, numeric)
+            for buffer_size in (2000, 20000, 10 ** 9):
+                actual = self.sort(
+                                rows, cols, ascs, numeric,
+                                buffer_size=buffer_size,
+                                temporary_directory=self.directory,
+                            )
+                self.assertEqual(actual, expected, (cols, ascs, numeric, buffer_size))
+        self.assertEqual(os.listdir(self.directory), ['s.csv'])
+
+    def test_parallel(self):
+        csvu.sort.PARALLEL_ROWS = 1
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            expected = self.expected(rows, cols, ascs, numeric)
+            actual = self.sort(rows, cols, ascs, numeric, parallel=2)
+            self.assertEqual(actual, expected, (cols, ascs, numeric))
+            actual = self.sort(rows, cols, ascs, numeric, parallel=2, buffer_size=20000)
+            self.assertEqual(actual, expected, (cols, ascs, numeric))
+
+    def test_limit(self):
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            expected = self.expected(rows, cols, ascs, numeric)
+            for limit in (0, 1, 7, self.n, self.n + 1):
+                actual = self.sort(rows, cols, ascs, numeric, limit=limit)
+                self.assertEqual(actual, expected[:limit], (cols, ascs, numeric, limit))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_numeric_vector(self):
+        csvu.sort.NUMPY_ROWS = 0
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            if not numeric:
+                continue
+            key = csvu.sort.key_make(cols, numeric=True, ascs=ascs)
+            expected = [row.values() for row in sorted(rows, key=key)]
+            actual = self.sort(rows, cols, ascs, numeric)
+            self.assertEqual(actual, expected, (cols, ascs))
+
+    def test_merge(self):
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            expected = self.expected(rows, cols, ascs, numeric)
+            parts = [rows[0:100], rows[100:350], rows[350:]]
+            row_gs = [iter(self.sort(part, cols, ascs, numeric)) for part in parts]
+            # merge_g takes dictionaries, the sorted parts are lists.
+            row_gs = [(dict(zip(rows[0].keys(), cells)) for cells in g) for g in row_gs]
+            actual = merge_g(row_gs, cols, asc=ascs[0], numeric=numeric, ascs=ascs)
+            actual = [[row[fn] for fn in rows[0].keys()] for row in actual]
+            self.assertEqual(actual, expected, (cols, ascs, numeric))
+
+    def test_merge_unsorted(self):
+        rows = self.rows()
+        self.assertRaises(Exception, list, merge_g([iter(rows)], ['key'], asc=True))
+
+    def test_check(self):
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            sorted_rows = list(filter_g(iter(rows), cols, asc=ascs[0], numeric=numeric, ascs=ascs))
+            self.assertIsNone(disorder_find(iter(sorted_rows), cols, asc=ascs[0], numeric=numeric, ascs=ascs))
+            # Move the last row first, which then comes before the
+            # second, unless their keys are equal.
+            i = 1
+            key = csvu.sort.key_make(cols, numeric=numeric)
+            while key(sorted_rows[i]) == key(sorted_rows[-1]):
+                i += 1
+            moved = sorted_rows[i:] + sorted_rows[:i]
+            d = disorder_find(iter(moved), cols, asc=ascs[0], numeric=numeric, ascs=ascs)
+            self.assertIsNotNone(d, (cols, ascs, numeric))
+            self.assertEqual(d.i, len(sorted_rows) - i, (cols, ascs, numeric))
+
+    def test_offsets(self):
+        rows = self.rows()
+        for cols, ascs, numeric in cases_g():
+            for limit in (None, 5):
+                expected = self.expected(rows, cols, ascs, numeric)[:limit]
+                d = offsets_sort(
+                            self.path,
+                            cols,
+                            asc=ascs[0],
+                            numeric=numeric,
+                            ascs=ascs,
+                            dialect='excel',
+                            limit=limit,
+                        )
+                self.assertEqual(d['fieldnames'], ['id', 'key', 'num', 'text'])
+                actual = list(reader(StringIO(''.join(d['records']))))
+                self.assertEqual(actual, expected, (cols, ascs, numeric, limit))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_offsets_vector(self):
+        csvu.sort.NUMPY_ROWS = 0
+        self.test_offsets()
+
+if __name__ == '__main__':
+    unittest.main()